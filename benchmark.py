@@ -0,0 +1,266 @@
+"""
+Benchmark for the check-in and roster hot paths.
+
+Runs the FastAPI app in-process against the in-memory Google Sheets
+stand-in (STORAGE_BACKEND=fake_sheets) and reports throughput, latency
+percentiles and simulated Sheets API calls per operation.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --latency-ms 150 --batch-sizes 1,25,100 --concurrency 50
+    python benchmark.py --json bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the InnovateX API against a simulated Google Sheets backend")
+    parser.add_argument("--latency-ms", type=float, default=100, help="simulated latency per Sheets API call")
+    parser.add_argument("--quota", type=int, default=0, help="simulated Sheets API calls per minute (0 = unlimited)")
+    parser.add_argument("--teams", type=int, default=200, help="sample teams per roster sheet")
+    parser.add_argument("--requests", type=int, default=40, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight at once")
+    parser.add_argument("--batch-sizes", default="1,10,50,200", help="comma separated mass attendance batch sizes")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.8, help="share of duplicates in the duplicate-heavy scenario")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this JSON file")
+    return parser.parse_args()
+
+args = parse_args()
+work_dir = tempfile.mkdtemp(prefix="innovatex-bench-")
+
+# Configure the app before importing it
+os.environ.update({
+    "STORAGE_BACKEND": "fake_sheets",
+    "FAKE_SHEETS_LATENCY_MS": str(args.latency_ms),
+    "FAKE_SHEETS_QUOTA_PER_MINUTE": str(args.quota),
+    "DEMO_TEAMS_PER_SHEET": str(args.teams),
+    "SHEETS_READS_PER_MINUTE": os.getenv("SHEETS_READS_PER_MINUTE", "1000000"),
+    "SHEETS_WRITES_PER_MINUTE": os.getenv("SHEETS_WRITES_PER_MINUTE", "1000000"),
+    "ATTENDANCE_JOURNAL_PATH": os.path.join(work_dir, "attendance_journal.db"),
+    "ROSTER_SNAPSHOT_PATH": "",
+    "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+})
+
+import sheets_scanner  # noqa: E402
+
+class InProcessClient:
+    """Minimal ASGI client: sends one HTTP request straight into the app"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, body=None, headers: dict = None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        raw_path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": raw_path,
+            "raw_path": raw_path.encode(),
+            "query_string": query.encode(),
+            "headers": [(b"host", b"bench"), (b"content-type", b"application/json"),
+                        (b"content-length", str(len(payload)).encode())]
+                       + [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        received = False
+        status = None
+        chunks = []
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            await asyncio.sleep(3600)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, b"".join(chunks)
+
+def percentile(samples: list, pct: float):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def api_call_delta(before: dict, after: dict):
+    return {operation: after.get(operation, 0) - before.get(operation, 0)
+            for operation in after if after.get(operation, 0) - before.get(operation, 0)}
+
+def reset_state():
+    """Fresh stand-in spreadsheets and cold caches between scenarios"""
+    sheets_scanner.sheets_manager.reset()
+    sheets_scanner.worksheet_directory.invalidate()
+    sheets_scanner.roster_cache.invalidate()
+    sheets_scanner.attendance_index.invalidate()
+    sheets_scanner.storage.ensure_attendance_worksheets()
+
+class RegnoSequence:
+    """Unique registration numbers across the whole run"""
+
+    def __init__(self):
+        self.next = 0
+
+    def take(self, count: int):
+        start = self.next
+        self.next += count
+        return [f"BENCH{number:07d}" for number in range(start, start + count)]
+
+def attendance_body(regnos: list, category: str = "AI/ML"):
+    return {"attendance_records": [
+        {"regno": regno, "name": f"Student {regno}", "day": "1", "event_type": "bootcamp", "category": category}
+        for regno in regnos
+    ]}
+
+async def run_scenario(client, name: str, requests: list, records_per_request: int, concurrency: int):
+    """Fire (method, path, body[, headers]) requests with bounded concurrency and collect timings"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async def one(method, path, body, headers=None):
+        async with semaphore:
+            started = time.perf_counter()
+            status, _ = await client.request(method, path, body, headers)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    calls_before = sheets_scanner.sheets_manager.api_calls()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    elapsed = time.perf_counter() - started
+    calls = api_call_delta(calls_before, sheets_scanner.sheets_manager.api_calls())
+    total_calls = sum(count for operation, count in calls.items() if operation != "quota_exceeded")
+
+    return {
+        "scenario": name,
+        "requests": len(requests),
+        "records": len(requests) * records_per_request,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(requests) / elapsed, 1) if elapsed else 0.0,
+        "records_per_second": round(len(requests) * records_per_request / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "statuses": statuses,
+        "sheets_calls": calls,
+        "sheets_calls_per_request": round(total_calls / len(requests), 2) if requests else 0.0,
+    }
+
+async def drain_journal(records: int):
+    """Flush the write-behind journal to the stand-in sheets and time it"""
+    calls_before = sheets_scanner.sheets_manager.api_calls()
+    started = time.perf_counter()
+    while await sheets_scanner.run_sheets_call(sheets_scanner.flush_attendance_journal):
+        pass
+    elapsed = time.perf_counter() - started
+    calls = api_call_delta(calls_before, sheets_scanner.sheets_manager.api_calls())
+    return {
+        "scenario": "attendance queued drain",
+        "requests": 0,
+        "records": records,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": 0.0,
+        "records_per_second": round(records / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": 0.0,
+        "p95_ms": 0.0,
+        "p99_ms": 0.0,
+        "statuses": {},
+        "sheets_calls": calls,
+        "sheets_calls_per_request": 0.0,
+    }
+
+async def main():
+    app = sheets_scanner.app
+    client = InProcessClient(app)
+    regnos = RegnoSequence()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size.strip()]
+    results = []
+
+    async with app.router.lifespan_context(app):
+        # Single-record check-ins, as scanners send them
+        reset_state()
+        requests = [("POST", "/attendance", attendance_body(regnos.take(1))) for _ in range(args.requests)]
+        results.append(await run_scenario(client, "attendance single", requests, 1, args.concurrency))
+
+        # Mass attendance at increasing batch sizes
+        for size in batch_sizes:
+            reset_state()
+            requests = [("POST", "/attendance", attendance_body(regnos.take(size))) for _ in range(max(1, args.requests // 4))]
+            results.append(await run_scenario(client, f"attendance mass x{size}", requests, size, args.concurrency))
+
+        # Duplicate-heavy batches: most records were already checked in
+        reset_state()
+        size = max(batch_sizes)
+        already_recorded = regnos.take(size)
+        await client.request("POST", "/attendance", attendance_body(already_recorded))
+        duplicates = int(size * args.duplicate_ratio)
+        requests = [("POST", "/attendance", attendance_body(already_recorded[:duplicates] + regnos.take(size - duplicates)))
+                    for _ in range(max(1, args.requests // 4))]
+        results.append(await run_scenario(client, f"attendance duplicates {int(args.duplicate_ratio * 100)}% x{size}",
+                                          requests, size, args.concurrency))
+
+        # Scanner retries carrying the Idempotency-Key of a request that already succeeded
+        reset_state()
+        originals = [("POST", "/attendance", attendance_body(regnos.take(1)), {"Idempotency-Key": f"bench-{i}"})
+                     for i in range(args.requests)]
+        await asyncio.gather(*(client.request(*request) for request in originals))
+        results.append(await run_scenario(client, "attendance retries (idempotent)", originals, 1, args.concurrency))
+        
+        # Queued (write-behind) check-ins
+        reset_state()
+        requests = [("POST", "/attendance?mode=queued", attendance_body(regnos.take(1))) for _ in range(args.requests)]
+        results.append(await run_scenario(client, "attendance queued", requests, 1, args.concurrency))
+        results.append(await drain_journal(len(requests)))
+
+        # Concurrent roster reads: cold cache, then warm cache
+        paths = ["/teams-by-category/AIML", "/teams-by-category/Cyber", "/teams-by-category/fullstack", "/teams"]
+        reads = [("GET", paths[i % len(paths)], None) for i in range(args.requests * 4)]
+        reset_state()
+        results.append(await run_scenario(client, "roster reads cold", reads, 1, args.concurrency * 4))
+        results.append(await run_scenario(client, "roster reads warm", reads, 1, args.concurrency * 4))
+
+    return results
+
+def print_table(results: list):
+    header = f"{'scenario':<34}{'req':>6}{'req/s':>9}{'rec/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'calls/req':>11}  statuses"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(f"{result['scenario']:<34}{result['requests']:>6}{result['requests_per_second']:>9}"
+              f"{result['records_per_second']:>10}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+              f"{result['sheets_calls_per_request']:>11}  {result['statuses']}")
+    print()
+    print("Sheets API calls per scenario:")
+    for result in results:
+        print(f"  {result['scenario']:<34}{result['sheets_calls']}")
+
+if __name__ == "__main__":
+    results = asyncio.run(main())
+
+    print(f"Simulated Sheets latency: {args.latency_ms} ms, quota: {args.quota or 'unlimited'}/min, "
+          f"teams per sheet: {args.teams}, concurrency: {args.concurrency}")
+    print()
+    print_table(results)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
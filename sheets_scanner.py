@@ -1,158 +1,1239 @@
 import gspread
+import base64
 import json
+import logging
 import os
+import sys
+import sqlite3
+import threading
+import time
+import random
+import itertools
+import bisect
+import codecs
+import csv
+import hashlib
+import hmac
+import secrets
 from google.oauth2.service_account import Credentials
-import traceback
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from google.auth.transport.requests import Request as GoogleAuthRequest
+import requests
+from collections import Counter, deque
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
+from cachetools import Cache, LRUCache, TTLCache
 from datetime import datetime
 
-def scan_google_sheets():
-    try:
-        # Load credentials from environment variables
-        print("Loading credentials from environment variables...")
-        
-        # Check if running on Render (environment variables) or locally (JSON file)
-        if os.getenv('GOOGLE_PROJECT_ID'):
-            # Use environment variables (for Render deployment)
-            creds_info = {
-                "type": os.getenv('GOOGLE_CREDENTIALS_TYPE'),
-                "project_id": os.getenv('GOOGLE_PROJECT_ID'),
-                "private_key_id": os.getenv('GOOGLE_PRIVATE_KEY_ID'),
-                "private_key": os.getenv('GOOGLE_PRIVATE_KEY').replace('\\n', '\n'),
-                "client_email": os.getenv('GOOGLE_CLIENT_EMAIL'),
-                "client_id": os.getenv('GOOGLE_CLIENT_ID'),
-                "auth_uri": os.getenv('GOOGLE_AUTH_URI'),
-                "token_uri": os.getenv('GOOGLE_TOKEN_URI'),
-                "auth_provider_x509_cert_url": os.getenv('GOOGLE_AUTH_PROVIDER_X509_CERT_URL'),
-                "client_x509_cert_url": os.getenv('GOOGLE_CLIENT_X509_CERT_URL'),
-                "universe_domain": os.getenv('GOOGLE_UNIVERSE_DOMAIN')
+# Logging: LOG_LEVEL (DEBUG shows per-row diagnostics) and LOG_FORMAT ("json" or "text")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Per-event sampling, e.g. "attendance.saved=0.1,roster.row=0.01"; unlisted events are always logged
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: time, level, event, message and the event's fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextLogFormatter(logging.Formatter):
+    """Human-readable lines for local development: level, message and key=value fields"""
+
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.getMessage()}"
+        fields = getattr(record, "fields", {})
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+def parse_sample_rates(spec: str):
+    """'event=rate,...' -> {event: rate}; malformed entries are ignored"""
+    rates = {}
+    for item in spec.split(","):
+        event, _, rate = item.partition("=")
+        try:
+            rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+class EventSampler:
+    """Keeps a random share of the lines for each sampled event and counts the rest"""
+
+    def __init__(self, rates: dict):
+        self.rates = rates
+        self.suppressed = Counter()
+
+    def should_log(self, event: str):
+        rate = self.rates.get(event)
+        if rate is None or rate >= 1.0 or random.random() < rate:
+            return True
+        self.suppressed[event] += 1
+        return False
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT):
+    """Set up the app logger once; later calls return it unchanged"""
+    app_logger = logging.getLogger("innovatex")
+    if not app_logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonLogFormatter() if log_format == "json" else TextLogFormatter())
+        app_logger.addHandler(handler)
+        app_logger.setLevel(getattr(logging, level, logging.INFO))
+        app_logger.propagate = False
+    return app_logger
+
+logger = configure_logging()
+log_sampler = EventSampler(parse_sample_rates(LOG_SAMPLE_RATES))
+
+def log_event(level: int, event: str, message: str, exc_info: bool = False, **fields):
+    """Log one structured event; skipped cheaply when its level is off or the event is sampled out"""
+    if not logger.isEnabledFor(level) or not log_sampler.should_log(event):
+        return
+    logger.log(level, message, exc_info=exc_info, extra={"event": event, "fields": fields})
+
+# Spreadsheet IDs
+REGISTRATION_SHEET_ID = "1I7ddC_ij6L0fnkowLMBjxiZzKF7eICEktYobUXpPCVI"
+ATTENDANCE_SHEET_ID = "1Nw0GzQuxKZYefPGPRvcQZk4RlkRnZLsIwPc6RD7SPBI"
+
+# Worksheet gids inside the registration spreadsheet
+TEAMS_GID = "1893068366"        # Main teams/domains sheet
+AIML_BATCH_GID = "1880278751"   # AI/ML batch sheet
+CYBER_BATCH_GID = "1671574899"  # Cyber batch sheet
+
+# OAuth scopes used by the service account
+SHEETS_SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Refresh the access token this many seconds before it actually expires
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+def load_credentials_info():
+    """
+    Load service account credentials from environment variables (Render) or credentials.json (local)
+    """
+    if os.getenv('GOOGLE_PROJECT_ID'):
+        # Use environment variables (for Render deployment)
+        log_event(logging.INFO, "credentials.loaded", "Using environment variables for credentials", source="env")
+        return {
+            "type": os.getenv('GOOGLE_CREDENTIALS_TYPE'),
+            "project_id": os.getenv('GOOGLE_PROJECT_ID'),
+            "private_key_id": os.getenv('GOOGLE_PRIVATE_KEY_ID'),
+            "private_key": os.getenv('GOOGLE_PRIVATE_KEY').replace('\\n', '\n'),
+            "client_email": os.getenv('GOOGLE_CLIENT_EMAIL'),
+            "client_id": os.getenv('GOOGLE_CLIENT_ID'),
+            "auth_uri": os.getenv('GOOGLE_AUTH_URI'),
+            "token_uri": os.getenv('GOOGLE_TOKEN_URI'),
+            "auth_provider_x509_cert_url": os.getenv('GOOGLE_AUTH_PROVIDER_X509_CERT_URL'),
+            "client_x509_cert_url": os.getenv('GOOGLE_CLIENT_X509_CERT_URL'),
+            "universe_domain": os.getenv('GOOGLE_UNIVERSE_DOMAIN')
+        }
+
+    # Use local JSON file (for local development)
+    with open('credentials.json', 'r') as f:
+        creds_info = json.load(f)
+    log_event(logging.INFO, "credentials.loaded", "Using local credentials.json file", source="file")
+    return creds_info
+
+# Latency histogram buckets (seconds) for requests and Google Sheets calls
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class MetricsRegistry:
+    """
+    Prometheus-style counters and histograms, safe to update from worker
+    threads. render() produces the text exposition format served by /metrics.
+    """
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._help = {}
+        # name -> {label tuple: value} / {label tuple: [bucket counts..., sum, count]}
+        self._counters = {}
+        self._histograms = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def counter_values(self, name: str):
+        """{label dict as tuple: value} snapshot of one counter"""
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ""
+        escaped = []
+        for key, value in labels:
+            value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+            escaped.append(f'{key}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+    def _header(self, lines: list, name: str, default_kind: str):
+        kind, help_text = self._help.get(name, (default_kind, ""))
+        if help_text:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def render(self, gauges: dict = None):
+        """
+        Text exposition of every metric. gauges maps a metric name to
+        {label tuple: value} computed at scrape time.
+        """
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                self._header(lines, name, "counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{self._format_labels(labels)} {value}")
+            for name in sorted(self._histograms):
+                self._header(lines, name, "histogram")
+                for labels, state in sorted(self._histograms[name].items()):
+                    for i, bound in enumerate(self.buckets):
+                        lines.append(f"{name}_bucket{self._format_labels(labels + (('le', bound),))} {state[i]}")
+                    lines.append(f"{name}_bucket{self._format_labels(labels + (('le', '+Inf'),))} {state[-1]}")
+                    lines.append(f"{name}_sum{self._format_labels(labels)} {round(state[-2], 6)}")
+                    lines.append(f"{name}_count{self._format_labels(labels)} {state[-1]}")
+        for name in sorted(gauges or {}):
+            self._header(lines, name, "gauge")
+            for labels, value in sorted(gauges[name].items()):
+                lines.append(f"{name}{self._format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+# Process-wide metrics, exported by /metrics
+metrics = MetricsRegistry()
+metrics.describe("http_requests_total", "counter", "HTTP requests by method, route and status")
+metrics.describe("http_request_duration_seconds", "histogram", "HTTP request latency by method and route")
+metrics.describe("sheets_api_calls_total", "counter", "Google Sheets API calls by operation, including retries")
+metrics.describe("sheets_api_call_duration_seconds", "histogram", "Google Sheets API call latency by operation")
+metrics.describe("sheets_api_errors_total", "counter", "Failed Google Sheets API calls by operation and status code")
+metrics.describe("sheets_api_throttled_total", "counter", "Google Sheets API 429 (quota exceeded) responses by operation")
+metrics.describe("sheets_api_queue_wait_seconds", "histogram", "Time Google Sheets calls waited for a quota token or slot")
+metrics.describe("google_auth_refresh_duration_seconds", "histogram", "Service account authorization and token refresh latency")
+metrics.describe("cache_lookups_total", "counter", "Cache lookups by cache and result (hit, stale, miss)")
+metrics.describe("login_attempts_total", "counter", "Login attempts by result: success, failed or throttled")
+metrics.describe("roster_sync_total", "counter", "Roster refreshes by result: unchanged (download skipped) or reloaded")
+metrics.describe("cache_hit_ratio", "gauge", "Share of cache lookups served from cache (hits and stale hits)")
+metrics.describe("roster_cache_entries", "gauge", "Rosters currently held in the roster cache")
+metrics.describe("sheets_scheduler_queue_depth", "gauge", "Google Sheets calls waiting in the scheduler")
+metrics.describe("sheets_scheduler_in_flight", "gauge", "Google Sheets calls currently running")
+metrics.describe("sheets_scheduler_quota_tokens", "gauge", "Google Sheets quota tokens left in the current window")
+metrics.describe("attendance_journal_entries", "gauge", "Queued attendance journal entries by status")
+
+# Google Sheets API quotas (requests per minute) and scheduler limits
+SHEETS_READS_PER_MINUTE = int(os.getenv("SHEETS_READS_PER_MINUTE", "60"))
+SHEETS_WRITES_PER_MINUTE = int(os.getenv("SHEETS_WRITES_PER_MINUTE", "60"))
+SHEETS_MAX_IN_FLIGHT = int(os.getenv("SHEETS_MAX_IN_FLIGHT", "4"))
+SHEETS_MAX_RETRIES = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+SHEETS_BACKOFF_BASE_SECONDS = 1.0
+SHEETS_BACKOFF_MAX_SECONDS = 32.0
+
+# Scheduler priorities: lower runs first
+PRIORITY_READ = 0
+PRIORITY_WRITE = 1
+
+class TokenBucket:
+    """Token bucket refilled continuously at per_minute / 60 tokens per second"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self):
+        self._refill()
+        return self.tokens >= 1
+
+    def take(self):
+        self.tokens -= 1
+
+    def seconds_until_token(self):
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+def is_retryable_api_error(error, kind: str = "read"):
+    """
+    429 (quota exceeded) responses are always worth retrying: the request was
+    not applied. 5xx responses are only retried for reads, because a failed
+    append or batch update may still have been applied and must not run twice.
+    """
+    code = getattr(error, "code", None)
+    if code is None and getattr(error, "response", None) is not None:
+        code = error.response.status_code
+    if code == 429:
+        return True
+    return kind == "read" and code is not None and code >= 500
+
+class SheetsApiScheduler:
+    """
+    Central gate for every Google Sheets API call.
+    Reads and writes draw from separate token buckets, at most
+    SHEETS_MAX_IN_FLIGHT calls run at once, and waiting reads are admitted
+    before waiting writes. 429 responses, and 5xx responses to reads, are
+    retried with jittered exponential backoff.
+    """
+
+    def __init__(self, reads_per_minute=SHEETS_READS_PER_MINUTE, writes_per_minute=SHEETS_WRITES_PER_MINUTE,
+                 max_in_flight=SHEETS_MAX_IN_FLIGHT, max_retries=SHEETS_MAX_RETRIES):
+        self._buckets = {"read": TokenBucket(reads_per_minute), "write": TokenBucket(writes_per_minute)}
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self.calls = {"read": 0, "write": 0}
+        self.throttled = 0
+        self.retries = 0
+
+    def _next_runnable(self):
+        """First waiter (in priority order) whose bucket has a token"""
+        for ticket in self._waiting:
+            if self._buckets[ticket[2]].available():
+                return ticket
+        return None
+
+    def _acquire(self, kind: str, priority: int):
+        with self._cond:
+            ticket = (priority, next(self._sequence), kind)
+            self._waiting.append(ticket)
+            self._waiting.sort()
+            try:
+                while True:
+                    if self._in_flight < self.max_in_flight and self._next_runnable() is ticket:
+                        self._buckets[kind].take()
+                        self._in_flight += 1
+                        return
+                    # Wake up when a token should be available, or when a slot is released
+                    self._cond.wait(timeout=max(self._buckets[kind].seconds_until_token(), 0.05))
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+    def _release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def call(self, kind: str, func, *args, priority: int = None, **kwargs):
+        """Run one gspread call ("read" or "write") under the quota and retry policy"""
+        if priority is None:
+            priority = PRIORITY_READ if kind == "read" else PRIORITY_WRITE
+        
+        operation = getattr(func, "__name__", "call")
+        attempt = 0
+        while True:
+            queued_at = time.monotonic()
+            self._acquire(kind, priority)
+            started = time.monotonic()
+            metrics.observe("sheets_api_queue_wait_seconds", started - queued_at, kind=kind)
+            metrics.inc("sheets_api_calls_total", operation=operation, kind=kind)
+            try:
+                self.calls[kind] += 1
+                return func(*args, **kwargs)
+            except gspread.exceptions.APIError as api_error:
+                code = getattr(api_error, "code", None)
+                metrics.inc("sheets_api_errors_total", operation=operation, code=code)
+                if code == 429:
+                    self.throttled += 1
+                    metrics.inc("sheets_api_throttled_total", operation=operation)
+                if not is_retryable_api_error(api_error, kind) or attempt >= self.max_retries:
+                    raise
+                error = api_error
+            except Exception:
+                metrics.inc("sheets_api_errors_total", operation=operation, code="error")
+                raise
+            finally:
+                metrics.observe("sheets_api_call_duration_seconds", time.monotonic() - started, operation=operation)
+                self._release()
+            
+            # Full jitter: sleep somewhere between 0 and the exponential cap
+            delay = random.uniform(0, min(SHEETS_BACKOFF_MAX_SECONDS, SHEETS_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+            attempt += 1
+            self.retries += 1
+            log_event(logging.WARNING, "sheets.retry", "Sheets API call failed, retrying",
+                      kind=kind, operation=operation, error=str(error), attempt=attempt,
+                      max_retries=self.max_retries, delay_seconds=round(delay, 2))
+            time.sleep(delay)
+
+    def read(self, func, *args, **kwargs):
+        return self.call("read", func, *args, **kwargs)
+
+    def write(self, func, *args, **kwargs):
+        return self.call("write", func, *args, **kwargs)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self._waiting),
+                "waiting_reads": sum(1 for ticket in self._waiting if ticket[2] == "read"),
+                "waiting_writes": sum(1 for ticket in self._waiting if ticket[2] == "write"),
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "read_tokens": int(self._buckets["read"].tokens),
+                "write_tokens": int(self._buckets["write"].tokens),
+                "calls": dict(self.calls),
+                "throttled_429": self.throttled,
+                "retries": self.retries
             }
-            print("✓ Using environment variables for credentials")
+
+# Every Google Sheets API call goes through this scheduler
+sheets_scheduler = SheetsApiScheduler()
+
+class SheetsClientManager:
+    """
+    Process-wide gspread client shared by every request and worker thread.
+    Authorizes once, refreshes the OAuth token before it expires and caches
+    one Spreadsheet handle per sheet ID.
+    """
+
+    def __init__(self, credentials_loader=load_credentials_info, scopes=SHEETS_SCOPES):
+        self._credentials_loader = credentials_loader
+        self._scopes = scopes
+        self._lock = threading.RLock()
+        self._credentials = None
+        self._client = None
+        self._spreadsheets = {}
+
+    def _token_needs_refresh(self):
+        if not self._credentials.valid or self._credentials.expiry is None:
+            return True
+        remaining = self._credentials.expiry - datetime.utcnow()
+        return remaining.total_seconds() < TOKEN_REFRESH_MARGIN_SECONDS
+
+    def get_client(self):
+        """Return the shared gspread client, authorizing or refreshing the token if needed"""
+        with self._lock:
+            if self._client is None:
+                log_event(logging.INFO, "sheets.authorize", "Setting up shared Google Sheets client")
+                started = time.monotonic()
+                self._credentials = Credentials.from_service_account_info(
+                    self._credentials_loader(), scopes=self._scopes
+                )
+                self._client = gspread.authorize(self._credentials)
+                metrics.observe("google_auth_refresh_duration_seconds", time.monotonic() - started, step="authorize")
+
+            if self._token_needs_refresh():
+                started = time.monotonic()
+                self._credentials.refresh(GoogleAuthRequest())
+                metrics.observe("google_auth_refresh_duration_seconds", time.monotonic() - started, step="refresh")
+                log_event(logging.INFO, "sheets.token_refreshed", "Google Sheets access token refreshed")
+
+            return self._client
+
+    def open_spreadsheet(self, sheet_id: str):
+        """Return a cached Spreadsheet handle for the given sheet ID"""
+        client = self.get_client()
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(sheet_id)
+            if spreadsheet is None:
+                spreadsheet = sheets_scheduler.read(client.open_by_key, sheet_id)
+                self._spreadsheets[sheet_id] = spreadsheet
+                log_event(logging.INFO, "sheets.opened", "Opened spreadsheet", sheet_id=sheet_id, title=spreadsheet.title)
+            return spreadsheet
+
+    def warm_up(self, sheet_ids=(REGISTRATION_SHEET_ID, ATTENDANCE_SHEET_ID)):
+        """Authorize, open the known spreadsheets and load their worksheet lists ahead of the first request"""
+        for sheet_id in sheet_ids:
+            self.open_spreadsheet(sheet_id)
+            worksheet_directory.worksheets(sheet_id)
+
+    def reset(self):
+        """Drop the client and all cached handles so the next call re-authorizes"""
+        with self._lock:
+            self._credentials = None
+            self._client = None
+            self._spreadsheets.clear()
+
+# Storage backend: "gspread" (Google Sheets), "sqlite" (local database) or
+# "fake_sheets" (in-process Google Sheets stand-in for load tests and benchmarks)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gspread").lower()
+
+# In-process Google Sheets stand-in settings
+FAKE_SHEETS_LATENCY_MS = float(os.getenv("FAKE_SHEETS_LATENCY_MS", "100"))
+FAKE_SHEETS_QUOTA_PER_MINUTE = int(os.getenv("FAKE_SHEETS_QUOTA_PER_MINUTE", "300"))
+DEMO_TEAMS_PER_SHEET = int(os.getenv("DEMO_TEAMS_PER_SHEET", "50"))
+
+def build_demo_rosters(teams_per_sheet: int = DEMO_TEAMS_PER_SHEET, seed: int = 7):
+    """
+    Deterministic sample registration data shaped like the real sheets.
+    Returns {gid: rows} with a header row first.
+    """
+    rng = random.Random(seed)
+    first_names = ["Aarav", "Diya", "Kavin", "Meera", "Rahul", "Sneha", "Vikram", "Anjali", "Arjun", "Nila",
+                   "Karthik", "Priya", "Joel", "Ruth", "Samuel", "Ananya", "Dev", "Ishaan", "Lakshmi", "Naveen"]
+    last_names = ["Kumar", "Raj", "Joseph", "Thomas", "Prabhu", "Nair", "Iyer", "Menon", "Das", "Paul"]
+    words = ["Byte", "Quantum", "Neural", "Cipher", "Pixel", "Vector", "Nova", "Echo", "Shadow", "Titan", "Orbit", "Spark"]
+    
+    def person():
+        return f"{rng.choice(first_names)} {rng.choice(last_names)}"
+    
+    def regno():
+        return f"URK2{rng.randint(2, 5)}CS{rng.randint(1000, 9999)}"
+    
+    def team_name(index):
+        return f"{rng.choice(words)} {rng.choice(words)} {index + 1}"
+    
+    roster_header = ["Timestamp", "Team Name", "Team Leader", "Reg Number1", "Leader WhatsApp Number",
+                     "Team Member 1", "Reg Number2", "Team Member 2", "Reg Number3", "Email Address"]
+    rosters = {}
+    for gid in (AIML_BATCH_GID, CYBER_BATCH_GID):
+        rows = [roster_header]
+        for index in range(teams_per_sheet):
+            rows.append(["2025-07-01 10:00:00", team_name(index), person(), regno(), f"9{rng.randint(100000000, 999999999)}",
+                         person(), regno(), person(), regno(), f"team{index + 1}@karunya.edu.in"])
+        rosters[gid] = rows
+    
+    teams_rows = [["Timestamp", "Team Name", "Domains", "Leader (Name & Reg)"]]
+    for index in range(teams_per_sheet):
+        teams_rows.append(["2025-07-01 10:00:00", team_name(index), rng.choice(["AI/ML", "Cyber", "Full Stack"]),
+                           f"{person()} - {regno()}"])
+    rosters[TEAMS_GID] = teams_rows
+    return rosters
+
+def _parse_a1_range(range_name: str):
+    """Split "'Title'!B2:B" into ("Title", "B2:B"); a bare title gives (title, None)"""
+    if range_name.startswith("'"):
+        end = 1
+        while True:
+            end = range_name.index("'", end)
+            if range_name[end + 1:end + 2] == "'":
+                end += 2
+                continue
+            break
+        title = range_name[1:end].replace("''", "'")
+        rest = range_name[end + 1:]
+        return title, rest[1:] if rest.startswith("!") else None
+    if "!" in range_name:
+        title, a1 = range_name.rsplit("!", 1)
+        return title, a1
+    return range_name, None
+
+def _column_index(letters: str):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+class InMemoryWorksheet:
+    """Worksheet of the in-process Google Sheets stand-in"""
+
+    def __init__(self, spreadsheet, worksheet_id: int, title: str, values: list = None):
+        self.spreadsheet = spreadsheet
+        self.id = worksheet_id
+        self.title = title
+        self.values = values or []
+
+    def get_all_values(self, *args, **kwargs):
+        self.spreadsheet.simulate_call("get_all_values")
+        return gspread.utils.fill_gaps([list(row) for row in self.values])
+
+    def get_all_records(self, *args, **kwargs):
+        self.spreadsheet.simulate_call("get_all_records")
+        if not self.values:
+            return []
+        header = self.values[0]
+        return [dict(zip(header, list(row) + [""] * (len(header) - len(row)))) for row in self.values[1:]]
+
+    def append_rows(self, rows, *args, **kwargs):
+        self.spreadsheet.simulate_call("append_rows")
+        self.values.extend([str(cell) for cell in row] for row in rows)
+        self.spreadsheet.touch()
+
+    def append_row(self, row, *args, **kwargs):
+        self.spreadsheet.simulate_call("append_row")
+        self.values.append([str(cell) for cell in row])
+        self.spreadsheet.touch()
+
+class InMemorySpreadsheet:
+    """
+    Spreadsheet of the in-process Google Sheets stand-in. Implements the
+    gspread calls this app makes, adds FAKE_SHEETS_LATENCY_MS per call and
+    answers 429 once more than FAKE_SHEETS_QUOTA_PER_MINUTE calls land in a minute.
+    """
+
+    def __init__(self, spreadsheet_id: str, title: str, latency_ms=FAKE_SHEETS_LATENCY_MS,
+                 quota_per_minute=FAKE_SHEETS_QUOTA_PER_MINUTE):
+        self.id = spreadsheet_id
+        self.title = title
+        self.latency_ms = latency_ms
+        self.quota_per_minute = quota_per_minute
+        self.api_calls = Counter()
+        self._sheets = []
+        self._lock = threading.Lock()
+        self._recent_calls = []
+        self._modified_ns = time.time_ns()
+
+    def touch(self):
+        """Advance the Drive modifiedTime after a write (strictly increasing)"""
+        with self._lock:
+            self._modified_ns = max(time.time_ns(), self._modified_ns + 1000)
+
+    def get_lastUpdateTime(self):
+        self.simulate_call("get_lastUpdateTime")
+        with self._lock:
+            seconds, nanos = divmod(self._modified_ns, 10**9)
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)) + f".{nanos // 1000:06d}Z"
+
+    def simulate_call(self, operation: str):
+        """Count the call, enforce the per-minute quota and sleep for the simulated latency"""
+        with self._lock:
+            self.api_calls[operation] += 1
+            if self.quota_per_minute:
+                now = time.monotonic()
+                self._recent_calls = [at for at in self._recent_calls if now - at < 60]
+                if len(self._recent_calls) >= self.quota_per_minute:
+                    self.api_calls["quota_exceeded"] += 1
+                    response = requests.Response()
+                    response.status_code = 429
+                    response._content = json.dumps({"error": {
+                        "code": 429,
+                        "message": "Quota exceeded for quota metric 'Requests' (simulated)",
+                        "status": "RESOURCE_EXHAUSTED"
+                    }}).encode()
+                    raise gspread.exceptions.APIError(response)
+                self._recent_calls.append(now)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def add_sheet(self, worksheet_id: int, title: str, values: list = None):
+        worksheet = InMemoryWorksheet(self, int(worksheet_id), title, values)
+        with self._lock:
+            self._sheets.append(worksheet)
+        self.touch()
+        return worksheet
+
+    def _by_title(self, title: str):
+        for worksheet in self._sheets:
+            if worksheet.title == title:
+                return worksheet
+        raise gspread.WorksheetNotFound(title)
+
+    def worksheets(self, *args, **kwargs):
+        self.simulate_call("worksheets")
+        return list(self._sheets)
+
+    def worksheet(self, title: str):
+        self.simulate_call("worksheet")
+        return self._by_title(title)
+
+    def values_batch_get(self, ranges, params=None):
+        self.simulate_call("values_batch_get")
+        value_ranges = []
+        for range_name in ranges:
+            title, a1 = _parse_a1_range(range_name)
+            rows = self._by_title(title).values
+            if a1 is None:
+                values = [list(row) for row in rows]
+            elif a1 == "1:1":
+                values = [list(rows[0])] if rows else []
+            else:
+                start, end = a1.split(":")
+                column = _column_index(start.rstrip("0123456789"))
+                first_row = int(start[len(start.rstrip("0123456789")):] or 1) - 1
+                values = [[row[column]] if column < len(row) and row[column] != "" else [] for row in rows[first_row:]]
+                while values and not values[-1]:
+                    values.pop()
+            value_range = {"range": range_name, "majorDimension": "ROWS"}
+            if values:
+                value_range["values"] = values
+            value_ranges.append(value_range)
+        return {"spreadsheetId": self.id, "valueRanges": value_ranges}
+
+    def batch_update(self, body):
+        self.simulate_call("batch_update")
+        for request in body.get("requests", []):
+            if "addSheet" in request:
+                properties = request["addSheet"]["properties"]
+                self.add_sheet(properties.get("sheetId", random.randint(1, 2**31 - 1)), properties["title"])
+            elif "updateCells" in request:
+                update = request["updateCells"]
+                worksheet = next(ws for ws in self._sheets if ws.id == update["start"]["sheetId"])
+                row_index = update["start"].get("rowIndex", 0)
+                for offset, row in enumerate(update["rows"]):
+                    cells = [cell["userEnteredValue"]["stringValue"] for cell in row["values"]]
+                    while len(worksheet.values) <= row_index + offset:
+                        worksheet.values.append([])
+                    worksheet.values[row_index + offset] = cells
+        self.touch()
+        return {"spreadsheetId": self.id, "replies": []}
+
+class InMemorySheetsManager:
+    """
+    Drop-in replacement for SheetsClientManager serving seeded in-memory
+    spreadsheets, so the whole Sheets code path runs without any network
+    """
+
+    def __init__(self, teams_per_sheet=DEMO_TEAMS_PER_SHEET, latency_ms=FAKE_SHEETS_LATENCY_MS,
+                 quota_per_minute=FAKE_SHEETS_QUOTA_PER_MINUTE):
+        self.teams_per_sheet = teams_per_sheet
+        self.latency_ms = latency_ms
+        self.quota_per_minute = quota_per_minute
+        self._lock = threading.Lock()
+        self._spreadsheets = {}
+        self.reset()
+
+    def reset(self):
+        """Re-seed the stand-in spreadsheets"""
+        registration = InMemorySpreadsheet(REGISTRATION_SHEET_ID, "InnovateX Registrations (in-memory)",
+                                           self.latency_ms, self.quota_per_minute)
+        rosters = build_demo_rosters(self.teams_per_sheet)
+        registration.add_sheet(TEAMS_GID, "Teams", rosters[TEAMS_GID])
+        registration.add_sheet(AIML_BATCH_GID, "AI/ML Batch", rosters[AIML_BATCH_GID])
+        registration.add_sheet(CYBER_BATCH_GID, "Cyber Batch", rosters[CYBER_BATCH_GID])
+        attendance = InMemorySpreadsheet(ATTENDANCE_SHEET_ID, "InnovateX Attendance (in-memory)",
+                                         self.latency_ms, self.quota_per_minute)
+        with self._lock:
+            self._spreadsheets = {REGISTRATION_SHEET_ID: registration, ATTENDANCE_SHEET_ID: attendance}
+            self._opened = set()
+
+    def get_client(self):
+        return self
+
+    def open_spreadsheet(self, sheet_id: str):
+        """Return the stand-in spreadsheet; like the real manager, only the first open costs an API call"""
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(sheet_id)
+            first_open = sheet_id not in self._opened
+            self._opened.add(sheet_id)
+        if spreadsheet is None:
+            raise gspread.SpreadsheetNotFound(sheet_id)
+        if first_open:
+            spreadsheet.simulate_call("open_by_key")
+        return spreadsheet
+
+    def warm_up(self, sheet_ids=(REGISTRATION_SHEET_ID, ATTENDANCE_SHEET_ID)):
+        for sheet_id in sheet_ids:
+            self.open_spreadsheet(sheet_id)
+            worksheet_directory.worksheets(sheet_id)
+
+    def api_calls(self):
+        """Simulated Google API calls per operation, summed over both spreadsheets"""
+        total = Counter()
+        for spreadsheet in self._spreadsheets.values():
+            total.update(spreadsheet.api_calls)
+        return dict(total)
+
+# Shared client manager, warmed up at app startup
+if STORAGE_BACKEND == "fake_sheets":
+    sheets_manager = InMemorySheetsManager()
+else:
+    sheets_manager = SheetsClientManager()
+
+# Seconds before a spreadsheet's worksheet list is re-read
+WORKSHEET_METADATA_TTL_SECONDS = float(os.getenv("WORKSHEET_METADATA_TTL_SECONDS", "300"))
+# Minimum gap between re-reads triggered by lookups that miss
+WORKSHEET_MISS_REFRESH_SECONDS = 10
+
+class WorksheetDirectory:
+    """
+    Cached worksheet list per spreadsheet, with lookups by gid and by title.
+    The list is loaded once and re-read when the TTL expires or when a
+    lookup misses (at most every WORKSHEET_MISS_REFRESH_SECONDS).
+    """
+
+    def __init__(self, manager, ttl_seconds=WORKSHEET_METADATA_TTL_SECONDS):
+        self._manager = manager
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}
+        # sheet_id -> lock held while that spreadsheet's worksheet list is loading
+        self._load_locks = {}
+
+    def _load(self, sheet_id: str):
+        spreadsheet = self._manager.open_spreadsheet(sheet_id)
+        worksheets = sheets_scheduler.read(spreadsheet.worksheets)
+        entry = {
+            "worksheets": worksheets,
+            "by_gid": {str(worksheet.id): worksheet for worksheet in worksheets},
+            "by_title": {worksheet.title: worksheet for worksheet in worksheets},
+            "loaded_at": time.monotonic()
+        }
+        with self._lock:
+            self._entries[sheet_id] = entry
+        log_event(logging.INFO, "worksheets.loaded", "Loaded worksheet list", title=spreadsheet.title, worksheets=len(worksheets))
+        return entry
+
+    def _refresh(self, sheet_id: str, max_age: float):
+        """
+        Entry at most max_age seconds old. Concurrent callers that miss wait
+        for one load of the worksheet list instead of each making their own.
+        """
+        with self._lock:
+            load_lock = self._load_locks.setdefault(sheet_id, threading.Lock())
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(sheet_id)
+            if entry is None or time.monotonic() - entry["loaded_at"] > max_age:
+                entry = self._load(sheet_id)
+            return entry
+
+    def _entry(self, sheet_id: str):
+        with self._lock:
+            entry = self._entries.get(sheet_id)
+        if entry is None or time.monotonic() - entry["loaded_at"] > self.ttl_seconds:
+            metrics.inc("cache_lookups_total", cache="worksheet_directory", result="miss")
+            entry = self._refresh(sheet_id, self.ttl_seconds)
         else:
-            # Use local JSON file (for local development)
-            with open('credentials.json', 'r') as f:
-                creds_info = json.load(f)
-            print("✓ Using local credentials.json file")
-        
-        # Set up the credentials and authorize
-        print("Setting up credentials...")
-        scope = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        creds = Credentials.from_service_account_info(creds_info, scopes=scope)
-        client = gspread.authorize(creds)
+            metrics.inc("cache_lookups_total", cache="worksheet_directory", result="hit")
+        return entry
+
+    def _lookup(self, sheet_id: str, index: str, key):
+        entry = self._entry(sheet_id)
+        worksheet = entry[index].get(key)
+        if worksheet is None and time.monotonic() - entry["loaded_at"] > WORKSHEET_MISS_REFRESH_SECONDS:
+            # The worksheet may have been added since the last load
+            worksheet = self._refresh(sheet_id, WORKSHEET_MISS_REFRESH_SECONDS)[index].get(key)
+        return worksheet
+
+    def worksheets(self, sheet_id: str):
+        """All worksheets of a spreadsheet, in sheet order"""
+        return list(self._entry(sheet_id)["worksheets"])
+
+    def by_gid(self, sheet_id: str, gid):
+        """Worksheet with the given gid, or None"""
+        return self._lookup(sheet_id, "by_gid", str(gid))
+
+    def by_title(self, sheet_id: str, title: str):
+        """Worksheet with the given title, or None"""
+        return self._lookup(sheet_id, "by_title", title)
+
+    def invalidate(self, sheet_id: str = None):
+        with self._lock:
+            if sheet_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(sheet_id, None)
+
+# Shared worksheet metadata for the known spreadsheets
+worksheet_directory = WorksheetDirectory(sheets_manager)
+
+# Maximum number of Google Sheets calls running at once; extra calls queue up
+SHEETS_MAX_CONCURRENCY = int(os.getenv("SHEETS_MAX_CONCURRENCY", "8"))
+
+# Blocking gspread work runs here so it never stalls the event loop
+sheets_executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_CONCURRENCY, thread_name_prefix="sheets")
+
+# Attendance writes get their own threads: check-ins waiting for write quota
+# (or for a worksheet lock) must not use up the threads roster reads need
+# to reach the scheduler, where reads are admitted first
+sheets_write_executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_CONCURRENCY, thread_name_prefix="sheets-write")
+
+async def run_sheets_call(func, *args, **kwargs):
+    """Run a blocking Google Sheets function on the bounded executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(sheets_executor, functools.partial(func, *args, **kwargs))
+
+async def run_sheets_write(func, *args, **kwargs):
+    """Like run_sheets_call, on the attendance write executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(sheets_write_executor, functools.partial(func, *args, **kwargs))
+
+# Fields returned for each team by get_teams_by_category, in output order
+ROSTER_FIELDS = ["team_name", "team_leader", "team_member1", "team_member2", "reg_leader", "reg_member1", "reg_member2"]
+
+def resolve_teams_columns(header_row: list):
+    """
+    Find the team name, domains and team leader columns of the main teams sheet
+    """
+    team_name_col = None
+    domains_col = None
+    team_leader_col = None
+    
+    # Look for team name, domains, and team leader columns (case insensitive)
+    for i, header in enumerate(header_row):
+        header_lower = header.lower()
         
-        # Extract spreadsheet ID from URL
-        sheet_id = "1I7ddC_ij6L0fnkowLMBjxiZzKF7eICEktYobUXpPCVI"
-        print(f"Attempting to open spreadsheet with ID: {sheet_id}")
+        if ('team' in header_lower and 'name' in header_lower) or header_lower == 'team name':
+            team_name_col = i
+            log_event(logging.DEBUG, "columns.match", f"Found team name column at index {i}")
+        elif 'domain' in header_lower:
+            domains_col = i
+            log_event(logging.DEBUG, "columns.match", f"Found domains column at index {i}")
+        elif ('team' in header_lower and 'leader' in header_lower and 'name' in header_lower and 'reg' in header_lower) or \
+             ('leader' in header_lower and 'name' in header_lower and 'reg' in header_lower) or \
+             ('leader' in header_lower and ('name' in header_lower or 'reg' in header_lower) and 'number' not in header_lower and 'whatsapp' not in header_lower):
+            team_leader_col = i
+            log_event(logging.DEBUG, "columns.match", f"Found team leader (name & reg) column at index {i}")
+    
+    # If exact matches not found, try broader search
+    if team_name_col is None:
+        for i, header in enumerate(header_row):
+            if 'team' in header.lower():
+                team_name_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for team column at index {i}: '{header}'")
+                break
+    
+    if domains_col is None:
+        for i, header in enumerate(header_row):
+            if any(word in header.lower() for word in ['domain', 'website', 'url', 'site']):
+                domains_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for domains column at index {i}: '{header}'")
+                break
+    
+    if team_leader_col is None:
+        for i, header in enumerate(header_row):
+            header_lower = header.lower()
+            # Look for team leader with name/reg but exclude number/whatsapp columns
+            if ('leader' in header_lower and 
+                ('name' in header_lower or 'reg' in header_lower) and 
+                'number' not in header_lower and 
+                'whatsapp' not in header_lower and
+                'phone' not in header_lower):
+                team_leader_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for team leader (name & reg) column at index {i}: '{header}'")
+                break
+    
+    return {"team_name": team_name_col, "domains": domains_col, "team_leader": team_leader_col}
+
+def resolve_roster_columns(header_row: list):
+    """
+    Find the team, member and registration number columns of a batch roster sheet
+    """
+    team_name_col = None
+    team_leader_col = None
+    team_member1_col = None
+    team_member2_col = None
+    reg_leader_col = None
+    reg_member1_col = None
+    reg_member2_col = None
+    
+    # Look for all columns with detailed matching
+    for i, header in enumerate(header_row):
+        header_lower = header.lower().strip()
         
-        # Try to open the spreadsheet
-        spreadsheet = client.open_by_key(sheet_id)
-        print(f"Successfully opened spreadsheet: {spreadsheet.title}")
+        # Team Name
+        if ('team' in header_lower and 'name' in header_lower) or header_lower == 'team name':
+            team_name_col = i
+            log_event(logging.DEBUG, "columns.match", f"Found team name column at index {i}: '{header}'")
         
-        # Get the specific worksheet by gid (1893068366)
-        print("Getting worksheets...")
-        worksheets = spreadsheet.worksheets()
-        print(f"Found {len(worksheets)} worksheets:")
+        # Team Leader
+        elif ('team' in header_lower and 'leader' in header_lower) or 'leader' in header_lower:
+            if 'reg' not in header_lower and 'number' not in header_lower:
+                team_leader_col = i
+                log_event(logging.DEBUG, "columns.match", f"Found team leader column at index {i}: '{header}'")
         
-        for ws in worksheets:
-            print(f"  - {ws.title} (ID: {ws.id})")
+        # Team Member 1
+        elif ('team' in header_lower and 'member' in header_lower and '1' in header_lower) or \
+             ('member' in header_lower and '1' in header_lower):
+            if 'reg' not in header_lower and 'number' not in header_lower:
+                team_member1_col = i
+                log_event(logging.DEBUG, "columns.match", f"Found team member 1 column at index {i}: '{header}'")
         
-        target_worksheet = None
+        # Team Member 2
+        elif ('team' in header_lower and 'member' in header_lower and '2' in header_lower) or \
+             ('member' in header_lower and '2' in header_lower):
+            if 'reg' not in header_lower and 'number' not in header_lower:
+                team_member2_col = i
+                log_event(logging.DEBUG, "columns.match", f"Found team member 2 column at index {i}: '{header}'")
         
-        # Try to find worksheet by gid
-        for worksheet in worksheets:
-            if str(worksheet.id) == "1893068366":
-                target_worksheet = worksheet
+        # Registration Numbers - Updated mapping
+        elif 'reg' in header_lower and ('number' in header_lower or 'no' in header_lower):
+            if 'leader' in header_lower or ('1' in header_lower and 'member' not in header_lower):
+                reg_leader_col = i
+                log_event(logging.DEBUG, "columns.match", f"Found registration number for leader (Reg Number1) column at index {i}: '{header}'")
+            elif '2' in header_lower:
+                reg_member1_col = i  # Reg Number2 goes to reg_member1
+                log_event(logging.DEBUG, "columns.match", f"Found registration number for member 1 (Reg Number2) column at index {i}: '{header}'")
+            elif '3' in header_lower:
+                reg_member2_col = i  # Reg Number3 goes to reg_member2
+                log_event(logging.DEBUG, "columns.match", f"Found registration number for member 2 (Reg Number3) column at index {i}: '{header}'")
+    
+    # Broader search if exact matches not found
+    if team_name_col is None:
+        for i, header in enumerate(header_row):
+            if 'team' in header.lower():
+                team_name_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for team column at index {i}: '{header}'")
                 break
-        
-        if not target_worksheet:
-            print(f"Worksheet with gid 1893068366 not found. Using first worksheet: {worksheets[0].title}")
-            target_worksheet = worksheets[0]
+    
+    if team_leader_col is None:
+        for i, header in enumerate(header_row):
+            if 'leader' in header.lower() and 'reg' not in header.lower():
+                team_leader_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for team leader column at index {i}: '{header}'")
+                break
+    
+    # Look for member columns if not found
+    if team_member1_col is None:
+        for i, header in enumerate(header_row):
+            header_lower = header.lower()
+            if 'member' in header_lower and ('1' in header_lower or 'one' in header_lower) and 'reg' not in header_lower:
+                team_member1_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for team member 1 column at index {i}: '{header}'")
+                break
+    
+    if team_member2_col is None:
+        for i, header in enumerate(header_row):
+            header_lower = header.lower()
+            if 'member' in header_lower and ('2' in header_lower or 'two' in header_lower) and 'reg' not in header_lower:
+                team_member2_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for team member 2 column at index {i}: '{header}'")
+                break
+    
+    # Look for registration number columns if not found - Updated logic
+    if reg_leader_col is None:
+        for i, header in enumerate(header_row):
+            header_lower = header.lower()
+            if ('reg' in header_lower or 'registration' in header_lower) and \
+               (('1' in header_lower and 'member' not in header_lower) or 'leader' in header_lower):
+                reg_leader_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for reg leader (Reg Number1) column at index {i}: '{header}'")
+                break
+    
+    if reg_member1_col is None:
+        for i, header in enumerate(header_row):
+            header_lower = header.lower()
+            if ('reg' in header_lower or 'registration' in header_lower) and '2' in header_lower:
+                reg_member1_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for reg member 1 (Reg Number2) column at index {i}: '{header}'")
+                break
+    
+    if reg_member2_col is None:
+        for i, header in enumerate(header_row):
+            header_lower = header.lower()
+            if ('reg' in header_lower or 'registration' in header_lower) and '3' in header_lower:
+                reg_member2_col = i
+                log_event(logging.DEBUG, "columns.match", f"Using broader match for reg member 2 (Reg Number3) column at index {i}: '{header}'")
+                break
+    
+    return {
+        "team_name": team_name_col,
+        "team_leader": team_leader_col,
+        "team_member1": team_member1_col,
+        "team_member2": team_member2_col,
+        "reg_leader": reg_leader_col,
+        "reg_member1": reg_member1_col,
+        "reg_member2": reg_member2_col
+    }
+
+# Resolved column maps keyed by (kind, worksheet id, trimmed header row)
+COLUMN_RESOLVERS = {"teams": resolve_teams_columns, "roster": resolve_roster_columns}
+_column_map_cache = LRUCache(maxsize=64)
+_column_map_lock = threading.Lock()
+
+# Last header row seen per (kind, worksheet id), trimmed, used to plan column-only reads
+_known_headers = {}
+
+def trim_header(header_row: list):
+    """
+    Header row without trailing empty cells. The API trims them from a 1:1
+    read, while a full read is padded to the widest row, so only the trimmed
+    forms can be compared.
+    """
+    end = len(header_row)
+    while end and not str(header_row[end - 1] or "").strip():
+        end -= 1
+    return list(header_row[:end])
+
+def get_column_map(kind: str, worksheet_id, header_row: list):
+    """
+    Return the column map for a worksheet header, running the header
+    heuristics only the first time a given header row is seen
+    """
+    header = trim_header(header_row)
+    key = (kind, str(worksheet_id), tuple(header))
+    with _column_map_lock:
+        columns = _column_map_cache.get(key)
+    metrics.inc("cache_lookups_total", cache="column_map", result="miss" if columns is None else "hit")
+    if columns is None:
+        log_event(logging.INFO, "columns.resolve", "Resolving columns for new header", kind=kind, worksheet_id=worksheet_id, header=header_row)
+        columns = COLUMN_RESOLVERS[kind](header_row)
+        with _column_map_lock:
+            _column_map_cache[key] = columns
+    with _column_map_lock:
+        _known_headers[(kind, str(worksheet_id))] = header
+    return columns
+
+def column_letter(col: int):
+    """0-based column index to its A1 letter(s)"""
+    return gspread.utils.rowcol_to_a1(1, col + 1).rstrip("0123456789")
+
+def _assemble_projected_rows(value_ranges: list, needed: list, columns: dict):
+    """Zip single-column value ranges into narrow rows and remap columns onto them"""
+    column_values = []
+    for value_range in value_ranges:
+        column_values.append([cell[0] if cell else "" for cell in value_range.get("values", [])])
+    row_count = max((len(values) for values in column_values), default=0)
+    for values in column_values:
+        values.extend([""] * (row_count - len(values)))
+    data_rows = [list(row) for row in zip(*column_values)]
+    position = {col: i for i, col in enumerate(needed)}
+    projected = {field: (position[col] if col is not None else None) for field, col in columns.items()}
+    return projected, data_rows
+
+def read_worksheets_columns(spreadsheet, targets: list):
+    """
+    Read the columns needed from several worksheets of one spreadsheet.
+    targets is a list of (worksheet, kind) pairs. Everything is fetched in
+    a single values_batch_get call. Worksheets with a known header layout
+    contribute the header row plus the mapped columns only. Worksheets seen
+    for the first time are fetched whole, and their columns resolved. A
+    worksheet whose header changed is re-read whole in one follow-up call.
+    Returns one (header_row, columns, data_rows) per target, where columns
+    index into data_rows; (None, None, None) for an empty sheet.
+    """
+    plans = []
+    ranges = []
+    for worksheet, kind in targets:
+        with _column_map_lock:
+            known_header = _known_headers.get((kind, str(worksheet.id)))
+        if known_header is not None:
+            columns = get_column_map(kind, worksheet.id, known_header)
+            needed = sorted({col for col in columns.values() if col is not None})
+            first = len(ranges)
+            ranges.append(gspread.utils.absolute_range_name(worksheet.title, "1:1"))
+            ranges += [gspread.utils.absolute_range_name(worksheet.title, f"{column_letter(col)}2:{column_letter(col)}")
+                       for col in needed]
+            plans.append(("columns", first, known_header, columns, needed))
         else:
-            print(f"Found target worksheet: {target_worksheet.title}")
-        
-        # Get all values from the sheet
-        print("Getting all values from the sheet...")
-        all_values = target_worksheet.get_all_values()
+            plans.append(("full", len(ranges), None, None, None))
+            ranges.append(gspread.utils.absolute_range_name(worksheet.title))
+    
+    value_ranges = sheets_scheduler.read(spreadsheet.values_batch_get, ranges).get("valueRanges", [])
+    
+    results = []
+    stale = []
+    for (worksheet, kind), (mode, first, known_header, columns, needed) in zip(targets, plans):
+        if mode == "columns":
+            header_values = value_ranges[first].get("values", [[]]) if first < len(value_ranges) else [[]]
+            header_row = header_values[0] if header_values else []
+            
+            # Header layout unchanged: assemble narrow rows from the fetched columns
+            if header_row and trim_header(header_row) == known_header:
+                projected, data_rows = _assemble_projected_rows(value_ranges[first + 1:first + 1 + len(needed)], needed, columns)
+                log_event(logging.DEBUG, "worksheet.read_columns", "Read projected columns",
+                          worksheet=worksheet.title, columns=len(needed), of=len(header_row))
+                results.append((header_row, projected, data_rows))
+                continue
+            
+            log_event(logging.INFO, "worksheet.header_changed", "Header changed, re-reading the whole sheet", worksheet=worksheet.title)
+            stale.append(len(results))
+            results.append(None)
+            continue
         
+        all_values = gspread.utils.fill_gaps(value_ranges[first].get("values", [])) if first < len(value_ranges) else []
         if not all_values:
-            print("No data found in the sheet.")
-            return
+            results.append((None, None, None))
+            continue
+        header_row = all_values[0]
+        results.append((header_row, get_column_map(kind, worksheet.id, header_row), all_values[1:]))
+    
+    if stale:
+        stale_ranges = [gspread.utils.absolute_range_name(targets[index][0].title) for index in stale]
+        stale_values = sheets_scheduler.read(spreadsheet.values_batch_get, stale_ranges).get("valueRanges", [])
+        for index, value_range in zip(stale, stale_values):
+            worksheet, kind = targets[index]
+            all_values = gspread.utils.fill_gaps(value_range.get("values", []))
+            if not all_values:
+                results[index] = (None, None, None)
+                continue
+            header_row = all_values[0]
+            results[index] = (header_row, get_column_map(kind, worksheet.id, header_row), all_values[1:])
+    
+    return results
+
+def read_worksheet_columns(spreadsheet, worksheet, kind: str):
+    """
+    Read only the columns a single worksheet kind needs; see read_worksheets_columns
+    """
+    return read_worksheets_columns(spreadsheet, [(worksheet, kind)])[0]
+
+def scan_google_sheets():
+    try:
+        sheet_id = REGISTRATION_SHEET_ID
         
-        print(f"Found {len(all_values)} rows of data")
-        print("Headers:", all_values[0])
+        # Get the shared spreadsheet handle
+        spreadsheet = sheets_manager.open_spreadsheet(sheet_id)
         
-        # Find columns for team name, domains, and team leader
-        header_row = all_values[0]
-        team_name_col = None
-        domains_col = None
-        team_leader_col = None
+        # Get the specific worksheet by gid from the cached worksheet list
+        worksheets = worksheet_directory.worksheets(sheet_id)
+        log_event(logging.DEBUG, "teams.worksheets", "Registration worksheets",
+                  worksheets=[f"{ws.title} ({ws.id})" for ws in worksheets])
         
-        # Look for team name, domains, and team leader columns (case insensitive)
-        for i, header in enumerate(header_row):
-            header_lower = header.lower()
-            print(f"Column {i}: '{header}' -> '{header_lower}'")
-            
-            if ('team' in header_lower and 'name' in header_lower) or header_lower == 'team name':
-                team_name_col = i
-                print(f"Found team name column at index {i}")
-            elif 'domain' in header_lower:
-                domains_col = i
-                print(f"Found domains column at index {i}")
-            elif ('team' in header_lower and 'leader' in header_lower and 'name' in header_lower and 'reg' in header_lower) or \
-                 ('leader' in header_lower and 'name' in header_lower and 'reg' in header_lower) or \
-                 ('leader' in header_lower and ('name' in header_lower or 'reg' in header_lower) and 'number' not in header_lower and 'whatsapp' not in header_lower):
-                team_leader_col = i
-                print(f"Found team leader (name & reg) column at index {i}")
-        
-        # If exact matches not found, try broader search
-        if team_name_col is None:
-            for i, header in enumerate(header_row):
-                if 'team' in header.lower():
-                    team_name_col = i
-                    print(f"Using broader match for team column at index {i}: '{header}'")
-                    break
+        target_worksheet = worksheet_directory.by_gid(sheet_id, TEAMS_GID)
         
-        if domains_col is None:
-            for i, header in enumerate(header_row):
-                if any(word in header.lower() for word in ['domain', 'website', 'url', 'site']):
-                    domains_col = i
-                    print(f"Using broader match for domains column at index {i}: '{header}'")
-                    break
+        if not target_worksheet:
+            log_event(logging.WARNING, "teams.worksheet_missing", "Teams worksheet not found, using the first worksheet",
+                      gid=TEAMS_GID, worksheet=worksheets[0].title)
+            target_worksheet = worksheets[0]
         
-        if team_leader_col is None:
-            for i, header in enumerate(header_row):
-                header_lower = header.lower()
-                # Look for team leader with name/reg but exclude number/whatsapp columns
-                if ('leader' in header_lower and 
-                    ('name' in header_lower or 'reg' in header_lower) and 
-                    'number' not in header_lower and 
-                    'whatsapp' not in header_lower and
-                    'phone' not in header_lower):
-                    team_leader_col = i
-                    print(f"Using broader match for team leader (name & reg) column at index {i}: '{header}'")
-                    break
+        # Get the needed columns from the sheet
+        header_row, columns, data_rows = read_worksheet_columns(spreadsheet, target_worksheet, "teams")
+        
+        if header_row is None:
+            log_event(logging.WARNING, "teams.empty", "No data found in the teams sheet", worksheet=target_worksheet.title)
+            return
+        
+        # Column positions, resolved once per header row
+        team_name_col = columns["team_name"]
+        domains_col = columns["domains"]
+        team_leader_col = columns["team_leader"]
         
         if team_name_col is None or domains_col is None:
-            print("Could not find team name or domains columns.")
-            print("Available headers:", header_row)
-            print("Please check the column names in your spreadsheet.")
+            log_event(logging.ERROR, "teams.columns_missing",
+                      "Could not find team name or domains columns; check the column names in the spreadsheet",
+                      headers=header_row)
             return
         
         # Extract team names, domains, and team leaders
+        debug_rows = logger.isEnabledFor(logging.DEBUG)
         team_data = []
-        for row_idx, row in enumerate(all_values[1:], 1):  # Skip header row
-            if len(row) > max(team_name_col, domains_col, team_leader_col or 0):
-                team_name = row[team_name_col].strip() if team_name_col < len(row) else ""
-                domains = row[domains_col].strip() if domains_col < len(row) else ""
-                team_leader = row[team_leader_col].strip() if team_leader_col is not None and team_leader_col < len(row) else ""
+        min_length = max(team_name_col, domains_col, team_leader_col or 0)
+        for row_idx, row in enumerate(data_rows, 1):
+            if len(row) > min_length:
+                team_name = row[team_name_col].strip()
+                domains = row[domains_col].strip()
+                team_leader = row[team_leader_col].strip() if team_leader_col is not None else ""
                 
                 if team_name and domains:  # Only include rows with both values
                     team_entry = {
@@ -165,30 +1246,18 @@ def scan_google_sheets():
                         team_entry['team_leader'] = team_leader
                     
                     team_data.append(team_entry)
-                    print(f"Row {row_idx}: {team_name} -> {domains}" + (f" (Leader: {team_leader})" if team_leader else ""))
-        
-        # Output the results
-        print("\n" + "=" * 50)
-        print(f"Found {len(team_data)} teams with data:")
-        print("=" * 50)
-        
-        for i, team in enumerate(team_data, 1):
-            print(f"{i}. Team Name: {team['team_name']}")
-            print(f"   Domains: {team['domains']}")
-            if 'team_leader' in team:
-                print(f"   Team Leader: {team['team_leader']}")
-            print("-" * 30)
+                    if debug_rows:
+                        log_event(logging.DEBUG, "teams.row", "Team row", row=row_idx, team_name=team_name,
+                                  domains=domains, team_leader=team_leader)
         
+        log_event(logging.INFO, "teams.loaded", "Loaded teams", worksheet=target_worksheet.title,
+                  rows=len(data_rows), teams=len(team_data))
         return team_data
         
     except Exception as e:
-        print(f"Error accessing the sheet: {e}")
-        print("Full error traceback:")
-        traceback.print_exc()
-        print("\nTroubleshooting steps:")
-        print("1. Make sure the service account email has been shared with the Google Sheet")
-        print("2. Check if the spreadsheet ID is correct")
-        print("3. Verify the credentials are valid")
+        # Usual causes: sheet not shared with the service account, wrong spreadsheet ID or invalid credentials
+        log_event(logging.ERROR, "teams.failed", "Error accessing the teams sheet", exc_info=True,
+                  sheet_id=REGISTRATION_SHEET_ID, error=str(e))
         return None
 
 # Pydantic model for single attendance record
@@ -208,38 +1277,76 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
-# Hardcoded user credentials (in production, this should be in a secure database)
+# Login sessions: HMAC signing key (set it in production so tokens survive restarts and
+# work across workers), token lifetime and how many verified tokens are kept in memory
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "43200"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+# Failed logins allowed per client IP and per email inside the window before answering 429
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "20"))
+LOGIN_MAX_FAILURES_PER_EMAIL = int(os.getenv("LOGIN_MAX_FAILURES_PER_EMAIL", "5"))
+LOGIN_THROTTLE_WINDOW_SECONDS = int(os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", "300"))
+
+# PBKDF2 work factor for new password hashes (stored hashes carry their own)
+PASSWORD_HASH_ITERATIONS = 200000
+
+# User credentials with salted password hashes (in production, this should be in a secure database).
+# Generate a hash with: python -c "import sheets_scanner; print(sheets_scanner.hash_password('...'))"
 USERS = {
     "dharshankumarjeyakumar@karunya.edu.in": {
-        "password": "Dharshan18@Innovate-x",
+        "password_hash": "pbkdf2_sha256$200000$sy9HJrz8XEPkHMeFOjhKuw$qFb4wiz2Dd7CWdw_56BGEihXCt-PojQxdkSpaVlu0CU",
         "name": "Admin User",
         "role": "administrator"
     },
     "ronniea@karunya.edu.in": {
-        "password": "Innovate-x@Ronnie34", 
+        "password_hash": "pbkdf2_sha256$200000$55EwlD06xI9WdxOE2WM5aA$jevcXjdQRG3vsLIc5RM_Sv3cLieVHMWgL3eCfA4srgE",
         "name": "Admin User",
         "role": "administrator"
     },
     "danishprabhu@karunya.edu.in": {
-        "password": "Danis22h@Innovate-x",
+        "password_hash": "pbkdf2_sha256$200000$zk31_3GT4mZYVNFv6sxWWg$auJ0jRS-10M8VjpA3X9j-NFl0o9SZf6rDkwSgvsqRE8",
         "name": "Admin User",
         "role": "administrator"
     },
     "deepakumar23@karunya.edu.in": {
-        "password": "Innovate-x@Deepa23", 
+        "password_hash": "pbkdf2_sha256$200000$Q5ycVXws1LAxQbTlnn7WjQ$Q17ja4uEAhEHFiRUCmjQJU_erueu62hsy6cMqpLwe6Y",
         "name": "Admin User",
         "role": "administrator"
     },
     "kevinj@karunya.edu.in": {
-        "password": "Kevin15@Innovate-x",
-        "name": "Admin User", 
+        "password_hash": "pbkdf2_sha256$200000$zPWmza7vQrRVn1tAMXq9Vg$BYzgLldYXqEgmUWAIoyGXs8vui1XnCT4S2JDJwrOQO0",
+        "name": "Admin User",
         "role": "administrator"
     }
 }
 
+def b64url_encode(data: bytes):
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def b64url_decode(text: str):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def hash_password(password: str, iterations: int = PASSWORD_HASH_ITERATIONS):
+    """Salted PBKDF2-SHA256 hash as 'pbkdf2_sha256$iterations$salt$digest'"""
+    salt = secrets.token_urlsafe(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations)
+    return f"pbkdf2_sha256${iterations}${salt}${b64url_encode(digest)}"
+
+def verify_password(password: str, password_hash: str):
+    """Check a password against a hash_password() string in constant time"""
+    try:
+        scheme, iterations, salt, expected = password_hash.split("$")
+        if scheme != "pbkdf2_sha256":
+            return False
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(b64url_encode(digest).encode(), expected.encode())
+
 def authenticate_user(email: str, password: str):
     """
-    Simple authentication function to verify user credentials
+    Simple authentication function to verify user credentials.
+    Password hashing is deliberately slow, so call it off the event loop.
     """
     try:
         # Check if email exists in our users database
@@ -252,7 +1359,7 @@ def authenticate_user(email: str, password: str):
         
         # Check if password matches
         user_data = USERS[email]
-        if user_data["password"] != password:
+        if not verify_password(password, user_data["password_hash"]):
             return {
                 "success": False,
                 "error": "Invalid password",
@@ -277,185 +1384,682 @@ def authenticate_user(email: str, password: str):
             "message": f"Internal server error: {str(e)}"
         }
 
-def save_attendance_to_sheets(regno: str, name: str, day: str, event_type: str, category: str = None):
-    try:
-        # Validation
-        if not regno or not name or not day or not event_type:
-            return {"error": "Registration number, name, day, and event_type are required"}
-        
-        # Event type validation
-        if event_type.lower() not in ["bootcamp", "hackathon"]:
-            return {"error": "Invalid event_type. Use 'bootcamp' or 'hackathon'"}
-        
-        # Day validation based on event type
-        if event_type.lower() == "bootcamp":
-            if day not in ["1", "2", "3", "4", "5"]:
-                return {"error": "Invalid day for bootcamp. Use '1', '2', '3', '4', or '5'"}
-            # Category is required for bootcamp
-            if not category:
-                return {"error": "Category is required for bootcamp events"}
-        elif event_type.lower() == "hackathon":
-            if day not in ["1", "2"]:
-                return {"error": "Invalid day for hackathon. Use '1' or '2'"}
-            # Category is not needed for hackathon, set default
-            category = "General"
-        
-        # Load credentials (same as scan_google_sheets function)
-        print("Loading credentials for attendance saving...")
-        
-        if os.getenv('GOOGLE_PROJECT_ID'):
-            creds_info = {
-                "type": os.getenv('GOOGLE_CREDENTIALS_TYPE'),
-                "project_id": os.getenv('GOOGLE_PROJECT_ID'),
-                "private_key_id": os.getenv('GOOGLE_PRIVATE_KEY_ID'),
-                "private_key": os.getenv('GOOGLE_PRIVATE_KEY').replace('\\n', '\n'),
-                "client_email": os.getenv('GOOGLE_CLIENT_EMAIL'),
-                "client_id": os.getenv('GOOGLE_CLIENT_ID'),
-                "auth_uri": os.getenv('GOOGLE_AUTH_URI'),
-                "token_uri": os.getenv('GOOGLE_TOKEN_URI'),
-                "auth_provider_x509_cert_url": os.getenv('GOOGLE_AUTH_PROVIDER_X509_CERT_URL'),
-                "client_x509_cert_url": os.getenv('GOOGLE_CLIENT_X509_CERT_URL'),
-                "universe_domain": os.getenv('GOOGLE_UNIVERSE_DOMAIN')
-            }
+class SessionTokens:
+    """
+    Stateless session tokens: base64url(JSON claims) + "." + base64url(HMAC-SHA256).
+    Verified tokens are kept in an LRU cache, so repeat requests with the same
+    token skip decoding and signature checks until the token expires.
+    """
+
+    def __init__(self, secret: str = SESSION_SECRET, ttl_seconds: int = SESSION_TTL_SECONDS,
+                 cache_size: int = SESSION_CACHE_SIZE):
+        if not secret:
+            secret = secrets.token_urlsafe(32)
+            log_event(logging.WARNING, "session.ephemeral_secret",
+                      "SESSION_SECRET is not set: using a random key, tokens end with this process")
+        self._key = secret.encode()
+        self.ttl_seconds = ttl_seconds
+        # token -> verified claims
+        self._verified = LRUCache(maxsize=cache_size)
+        self.issued = 0
+        self.rejected = 0
+
+    def _sign(self, payload: str):
+        return b64url_encode(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, user: dict):
+        """Signed token for an authenticated user; returns (token, expiry unix time)"""
+        expires_at = int(time.time()) + self.ttl_seconds
+        claims = {"sub": user["email"], "name": user["name"], "role": user["role"], "exp": expires_at}
+        payload = b64url_encode(json.dumps(claims, separators=(",", ":")).encode())
+        self.issued += 1
+        return f"{payload}.{self._sign(payload)}", expires_at
+
+    def verify(self, token: str):
+        """Claims of a valid, unexpired token, or None"""
+        claims = self._verified.get(token)
+        if claims is not None:
+            metrics.inc("cache_lookups_total", cache="session", result="hit")
         else:
-            with open('credentials.json', 'r') as f:
-                creds_info = json.load(f)
-        
-        # Set up credentials with write permissions
-        scope = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        creds = Credentials.from_service_account_info(creds_info, scopes=scope)
-        client = gspread.authorize(creds)
-        
-        # Attendance spreadsheet ID (from the provided link)
-        attendance_sheet_id = "1Nw0GzQuxKZYefPGPRvcQZk4RlkRnZLsIwPc6RD7SPBI"
-        
-        # Open the attendance spreadsheet
-        spreadsheet = client.open_by_key(attendance_sheet_id)
-        print(f"Successfully opened attendance spreadsheet: {spreadsheet.title}")
-        
-        # Determine which worksheet to use based on event_type and category
-        worksheet_name = None
-        
-        if event_type.lower() == "bootcamp":
-            if category.lower() in ["ai/ml", "ai", "ml", "artificial intelligence", "machine learning"]:
-                worksheet_name = "AI/ML Bootcamp"
-            elif category.lower() in ["cyber", "cybersecurity", "security"]:
-                worksheet_name = "Cyber Bootcamp"
-            elif category.lower() in ["full stack", "fullstack", "web development", "web dev"]:
-                worksheet_name = "Full Stack Development"
-            else:
-                return {"error": f"Invalid bootcamp category: {category}. Use 'AI/ML', 'Cyber', or 'Full Stack'"}
+            metrics.inc("cache_lookups_total", cache="session", result="miss")
+            payload, _, signature = token.partition(".")
+            # Compared as bytes: compare_digest rejects str arguments with non-ASCII characters
+            if not signature or not hmac.compare_digest(self._sign(payload).encode(), signature.encode()):
+                self.rejected += 1
+                return None
+            try:
+                claims = json.loads(b64url_decode(payload))
+            except ValueError:
+                self.rejected += 1
+                return None
+            self._verified[token] = claims
         
-        elif event_type.lower() == "hackathon":
-            if day == "1":
-                worksheet_name = "Hackathon Day 1"
-            elif day == "2":
-                worksheet_name = "Hackathon Day 2"
+        if claims.get("exp", 0) <= time.time():
+            self._verified.pop(token, None)
+            self.rejected += 1
+            return None
+        return claims
+
+    def stats(self):
+        return {
+            "cached_tokens": len(self._verified),
+            "ttl_seconds": self.ttl_seconds,
+            "issued": self.issued,
+            "rejected": self.rejected
+        }
+
+class LoginThrottle:
+    """
+    Sliding-window count of failed logins per client IP and per email.
+    Checked before any password hashing, so a credential-stuffing burst is
+    turned away cheaply instead of tying up worker threads.
+    """
+
+    def __init__(self, max_per_ip: int = LOGIN_MAX_FAILURES_PER_IP, max_per_email: int = LOGIN_MAX_FAILURES_PER_EMAIL,
+                 window_seconds: int = LOGIN_THROTTLE_WINDOW_SECONDS, max_tracked: int = 10000):
+        self.limits = {"ip": max_per_ip, "email": max_per_email}
+        self.window_seconds = window_seconds
+        # (kind, value) -> deque of failure times; bounded so a spray of IPs cannot grow it forever
+        self._failures = LRUCache(maxsize=max_tracked)
+        self.throttled = 0
+
+    def _recent(self, key, now: float):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and now - failures[0] >= self.window_seconds:
+            failures.popleft()
+        return failures
+
+    def retry_after(self, ip: str, email: str):
+        """Seconds until this IP and email may try again (0 if allowed now)"""
+        now = time.monotonic()
+        wait = 0
+        for kind, value in (("ip", ip), ("email", email)):
+            failures = self._recent((kind, value), now)
+            if failures and len(failures) >= self.limits[kind]:
+                wait = max(wait, self.window_seconds - (now - failures[0]))
+        if wait:
+            self.throttled += 1
+        return int(wait) + 1 if wait else 0
+
+    def record_failure(self, ip: str, email: str):
+        now = time.monotonic()
+        for kind, value in (("ip", ip), ("email", email)):
+            key = (kind, value)
+            failures = self._recent(key, now)
+            if failures is None:
+                failures = self._failures[key] = deque()
+            failures.append(now)
+
+    def reset(self, email: str):
+        """Forget an email's failures after a successful login"""
+        self._failures.pop(("email", email), None)
+
+    def stats(self):
+        return {
+            "tracked_keys": len(self._failures),
+            "max_failures_per_ip": self.limits["ip"],
+            "max_failures_per_email": self.limits["email"],
+            "window_seconds": self.window_seconds,
+            "throttled": self.throttled
+        }
+
+# Shared session signer and login throttle
+session_tokens = SessionTokens()
+login_throttle = LoginThrottle()
+
+async def require_session(authorization: str = Header(None)):
+    """Dependency: claims of the 'Authorization: Bearer <token>' session, or 401"""
+    scheme, _, token = (authorization or "").partition(" ")
+    claims = session_tokens.verify(token.strip()) if scheme.lower() == "bearer" and token.strip() else None
+    if claims is None:
+        raise HTTPException(
+            status_code=401,
+            detail={"success": False, "error": "Invalid session", "message": "Log in and send 'Authorization: Bearer <token>'"},
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return claims
+
+# Header row of every attendance worksheet
+ATTENDANCE_HEADERS = ["Registration Number", "Name", "Day", "Timestamp", "Event Type", "Category"]
+
+# Every worksheet resolve_attendance_target can pick, provisioned at startup
+ATTENDANCE_WORKSHEETS = ["AI/ML Bootcamp", "Cyber Bootcamp", "Full Stack Development", "Hackathon Day 1", "Hackathon Day 2"]
+
+# Result of the last provisioning run, served by /diagnostics/worksheets
+provisioning_report = {"checked_at": None}
+_provisioning_lock = threading.Lock()
+
+def _header_cells_request(sheet_id: int):
+    """batch_update request writing ATTENDANCE_HEADERS into row 1 of a worksheet"""
+    return {
+        "updateCells": {
+            "start": {"sheetId": sheet_id, "rowIndex": 0, "columnIndex": 0},
+            "rows": [{"values": [{"userEnteredValue": {"stringValue": header}} for header in ATTENDANCE_HEADERS]}],
+            "fields": "userEnteredValue"
+        }
+    }
+
+def provision_attendance_worksheets():
+    """
+    Make sure every attendance worksheet exists with its header row.
+    Missing worksheets are created and empty header rows filled in a single
+    batch_update. Worksheets whose header row differs from ATTENDANCE_HEADERS
+    are left alone and reported as drift. Returns the provisioning report.
+    """
+    global provisioning_report
+    with _provisioning_lock:
+        report = {
+            "checked_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "created": [],
+            "headers_written": [],
+            "drift": {},
+            "error": None
+        }
+        try:
+            spreadsheet = sheets_manager.open_spreadsheet(ATTENDANCE_SHEET_ID)
+            worksheet_directory.invalidate(ATTENDANCE_SHEET_ID)
+            existing = {worksheet.title: worksheet for worksheet in worksheet_directory.worksheets(ATTENDANCE_SHEET_ID)}
+            batch_requests = []
+            
+            # Header rows of the worksheets that already exist, in one read
+            present = [title for title in ATTENDANCE_WORKSHEETS if title in existing]
+            if present:
+                ranges = [gspread.utils.absolute_range_name(title, "1:1") for title in present]
+                value_ranges = sheets_scheduler.read(spreadsheet.values_batch_get, ranges).get("valueRanges", [])
+                for title, value_range in zip(present, value_ranges):
+                    values = value_range.get("values", [])
+                    header_row = values[0] if values else []
+                    if not header_row:
+                        batch_requests.append(_header_cells_request(existing[title].id))
+                        report["headers_written"].append(title)
+                    elif [header.strip() for header in header_row[:len(ATTENDANCE_HEADERS)]] != ATTENDANCE_HEADERS:
+                        report["drift"][title] = {"expected": ATTENDANCE_HEADERS, "found": header_row}
+            
+            # Missing worksheets get an explicit sheetId so their headers can go in the same batch
+            used_ids = {int(worksheet.id) for worksheet in existing.values()}
+            for title in ATTENDANCE_WORKSHEETS:
+                if title in existing:
+                    continue
+                new_id = random.randint(1, 2**31 - 1)
+                while new_id in used_ids:
+                    new_id = random.randint(1, 2**31 - 1)
+                used_ids.add(new_id)
+                batch_requests.append({
+                    "addSheet": {
+                        "properties": {
+                            "sheetId": new_id,
+                            "title": title,
+                            "gridProperties": {"rowCount": 1000, "columnCount": 10}
+                        }
+                    }
+                })
+                batch_requests.append(_header_cells_request(new_id))
+                report["created"].append(title)
+            
+            if batch_requests:
+                sheets_scheduler.write(spreadsheet.batch_update, {"requests": batch_requests})
+                worksheet_directory.invalidate(ATTENDANCE_SHEET_ID)
+                log_event(logging.INFO, "attendance.provisioned", "Provisioned attendance worksheets",
+                          created=report["created"], headers_written=report["headers_written"])
+            
+            if report["drift"]:
+                log_event(logging.WARNING, "attendance.header_drift", "Attendance header drift detected",
+                          worksheets=list(report["drift"]))
+                
+        except gspread.exceptions.APIError as api_error:
+            if "403" in str(api_error):
+                report["error"] = f"Permission denied: the service account needs editor permissions to create worksheets, or create them manually with headers: {', '.join(ATTENDANCE_HEADERS)}"
             else:
-                return {"error": f"Invalid hackathon day: {day}. Only days 1-2 are supported for hackathon."}
+                report["error"] = f"API error provisioning worksheets: {str(api_error)}"
+        except Exception as e:
+            report["error"] = f"Error provisioning worksheets: {str(e)}"
         
+        provisioning_report = report
+        return report
+
+def resolve_attendance_target(regno: str, name: str, day: str, event_type: str, category: str = None):
+    """
+    Validate a single attendance record and work out which worksheet it belongs to.
+    Returns {"worksheet_name": ..., "category": ...} or {"error": ...}
+    """
+    # Validation
+    if not regno or not name or not day or not event_type:
+        return {"error": "Registration number, name, day, and event_type are required"}
+    
+    # Event type validation
+    if event_type.lower() not in ["bootcamp", "hackathon"]:
+        return {"error": "Invalid event_type. Use 'bootcamp' or 'hackathon'"}
+    
+    # Day validation based on event type
+    if event_type.lower() == "bootcamp":
+        if day not in ["1", "2", "3", "4", "5"]:
+            return {"error": "Invalid day for bootcamp. Use '1', '2', '3', '4', or '5'"}
+        # Category is required for bootcamp
+        if not category:
+            return {"error": "Category is required for bootcamp events"}
+    elif event_type.lower() == "hackathon":
+        if day not in ["1", "2"]:
+            return {"error": "Invalid day for hackathon. Use '1' or '2'"}
+        # Category is not needed for hackathon, set default
+        category = "General"
+    
+    # Determine which worksheet to use based on event_type and category
+    if event_type.lower() == "bootcamp":
+        if category.lower() in ["ai/ml", "ai", "ml", "artificial intelligence", "machine learning"]:
+            worksheet_name = "AI/ML Bootcamp"
+        elif category.lower() in ["cyber", "cybersecurity", "security"]:
+            worksheet_name = "Cyber Bootcamp"
+        elif category.lower() in ["full stack", "fullstack", "web development", "web dev"]:
+            worksheet_name = "Full Stack Development"
+        else:
+            return {"error": f"Invalid bootcamp category: {category}. Use 'AI/ML', 'Cyber', or 'Full Stack'"}
+    
+    elif event_type.lower() == "hackathon":
+        if day == "1":
+            worksheet_name = "Hackathon Day 1"
+        elif day == "2":
+            worksheet_name = "Hackathon Day 2"
         else:
-            return {"error": f"Invalid event type: {event_type}. Use 'bootcamp' or 'hackathon'"}
+            return {"error": f"Invalid hackathon day: {day}. Only days 1-2 are supported for hackathon."}
+    
+    else:
+        return {"error": f"Invalid event type: {event_type}. Use 'bootcamp' or 'hackathon'"}
+    
+    return {"worksheet_name": worksheet_name, "category": category}
+
+def get_attendance_worksheet(spreadsheet, worksheet_name: str):
+    """
+    Find an attendance worksheet. They are provisioned at startup; if one
+    is missing anyway, provisioning runs again before giving up.
+    Returns (worksheet, None) or (None, error_dict)
+    """
+    # Look the worksheet up in the cached worksheet list
+    worksheet = worksheet_directory.by_title(spreadsheet.id, worksheet_name)
+    if worksheet is not None:
+        return worksheet, None
+    
+    log_event(logging.WARNING, "attendance.worksheet_missing", "Attendance worksheet not found, provisioning", worksheet=worksheet_name)
+    report = provision_attendance_worksheets()
+    worksheet = worksheet_directory.by_title(spreadsheet.id, worksheet_name)
+    if worksheet is not None:
+        return worksheet, None
+    
+    if report["error"] and report["error"].startswith("Permission denied"):
+        return None, {
+            "error": "Permission denied",
+            "message": f"The service account doesn't have permission to create worksheet '{worksheet_name}'. Please ensure the service account has editor permissions on the spreadsheet, or manually create the worksheet with headers: Registration Number, Name, Day, Timestamp, Event Type, Category"
+        }
+    return None, {"error": f"Error creating worksheet: {report['error'] or worksheet_name + ' is still missing'}"}
+
+# Track counted by /attendance/stats for each bootcamp worksheet. resolve_attendance_target
+# routes every category alias to one of these, so the worksheet is the reliable track;
+# rows of other worksheets (hackathon days) are counted under their stored category
+STATS_WORKSHEET_CATEGORIES = {"AI/ML Bootcamp": "AI/ML", "Cyber Bootcamp": "Cyber", "Full Stack Development": "Full Stack"}
+
+class AttendanceStats:
+    """
+    Check-in counters per attendance worksheet: total, per day, per category
+    and per hour. Updated on every successful append and rebuilt from the
+    sheet rows whenever the duplicate index (re)loads a worksheet, so
+    reading them never touches Google Sheets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._worksheets = {}
+        self._seeded_at = {}
+        self.updated_at = None
+
+    @staticmethod
+    def _empty():
+        return {"total": 0, "by_day": Counter(), "by_category": Counter(), "by_hour": Counter()}
+
+    @staticmethod
+    def _count(counters: dict, row: list, track: str = None):
+        # Rows follow ATTENDANCE_HEADERS: regno, name, day, timestamp, event type, category
+        day, timestamp, category = str(row[2]).strip(), str(row[3]), str(row[5]).strip()
+        counters["total"] += 1
+        counters["by_day"][day or "unknown"] += 1
+        counters["by_category"][track or category or "unknown"] += 1
+        # "2025-07-19 14:30:25" -> "2025-07-19 14:00"
+        counters["by_hour"][f"{timestamp[:13]}:00" if len(timestamp) >= 13 else "unknown"] += 1
+
+    def seed(self, worksheet_name: str, rows: list):
+        """Replace a worksheet's counters with counts over all of its rows"""
+        counters = self._empty()
+        track = STATS_WORKSHEET_CATEGORIES.get(worksheet_name)
+        for row in rows:
+            self._count(counters, row, track)
+        with self._lock:
+            self._worksheets[worksheet_name] = counters
+            self._seeded_at[worksheet_name] = time.time()
+            self.updated_at = time.time()
+
+    def record(self, worksheet_name: str, rows: list):
+        """Count rows that were just appended to a worksheet"""
+        with self._lock:
+            counters = self._worksheets.setdefault(worksheet_name, self._empty())
+            track = STATS_WORKSHEET_CATEGORIES.get(worksheet_name)
+            for row in rows:
+                self._count(counters, row, track)
+            self.updated_at = time.time()
+
+    def is_seeded(self, worksheet_name: str):
+        with self._lock:
+            return worksheet_name in self._seeded_at
+
+    def snapshot(self):
+        """Totals per worksheet plus combined day, category and hour counts"""
+        totals = {"by_day": Counter(), "by_category": Counter(), "by_hour": Counter()}
+        by_worksheet = {}
+        with self._lock:
+            for worksheet_name, counters in self._worksheets.items():
+                by_worksheet[worksheet_name] = {
+                    "total": counters["total"],
+                    "by_day": dict(sorted(counters["by_day"].items())),
+                    "by_category": dict(sorted(counters["by_category"].items())),
+                    "by_hour": dict(sorted(counters["by_hour"].items()))
+                }
+                for name in totals:
+                    totals[name].update(counters[name])
+            seeded = sorted(self._seeded_at)
+            updated_at = self.updated_at
         
-        # Try to find the worksheet
-        try:
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            print(f"Found existing worksheet: {worksheet_name}")
-        except gspread.WorksheetNotFound:
-            # If worksheet doesn't exist, try to create it
-            try:
-                print(f"Worksheet '{worksheet_name}' not found. Attempting to create it...")
-                worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=1000, cols=10)
-                # Add headers with name field
-                headers = ["Registration Number", "Name", "Day", "Timestamp", "Event Type", "Category"]
-                worksheet.append_row(headers)
-                print(f"Successfully created worksheet: {worksheet_name}")
-            except gspread.exceptions.APIError as api_error:
-                if "403" in str(api_error):
-                    return {
-                        "error": "Permission denied",
-                        "message": f"The service account doesn't have permission to create worksheet '{worksheet_name}'. Please ensure the service account has editor permissions on the spreadsheet, or manually create the worksheet with headers: Registration Number, Name, Day, Timestamp, Event Type, Category"
-                    }
-                else:
-                    return {"error": f"API error creating worksheet: {str(api_error)}"}
-            except Exception as create_error:
-                return {"error": f"Error creating worksheet: {str(create_error)}"}
+        return {
+            "total": sum(worksheet["total"] for worksheet in by_worksheet.values()),
+            "by_worksheet": by_worksheet,
+            "by_day": dict(sorted(totals["by_day"].items())),
+            "by_category": dict(sorted(totals["by_category"].items())),
+            "by_hour": dict(sorted(totals["by_hour"].items())),
+            "seeded_worksheets": seeded,
+            "updated_at": datetime.fromtimestamp(updated_at).strftime("%Y-%m-%d %H:%M:%S") if updated_at else None
+        }
+
+# Shared check-in counters served by /attendance/stats
+attendance_stats = AttendanceStats()
+
+# How long a worksheet's duplicate index is trusted before it is re-read from the sheet
+ATTENDANCE_INDEX_RESYNC_SECONDS = int(os.getenv("ATTENDANCE_INDEX_RESYNC_SECONDS", "600"))
+
+class AttendanceDuplicateIndex:
+    """
+    In-memory set of (Registration Number, Day) keys per attendance worksheet.
+    Filled once from the sheet, updated on every successful append and
+    re-synced after ATTENDANCE_INDEX_RESYNC_SECONDS or on demand.
+    """
+
+    def __init__(self, resync_seconds=ATTENDANCE_INDEX_RESYNC_SECONDS):
+        self.resync_seconds = resync_seconds
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._synced_at = {}
+        self._worksheet_locks = {}
+
+    @staticmethod
+    def make_key(regno, day):
+        return (str(regno).strip(), str(day).strip())
+
+    def worksheet_lock(self, worksheet_name: str):
+        """Lock serializing check-and-append for one worksheet"""
+        with self._lock:
+            return self._worksheet_locks.setdefault(worksheet_name, threading.Lock())
+
+    def _is_stale(self, worksheet_name: str):
+        synced_at = self._synced_at.get(worksheet_name)
+        return synced_at is None or time.monotonic() - synced_at > self.resync_seconds
+
+    def load(self, worksheet_name: str):
+        """
+        Rebuild the index for a worksheet from the storage backend.
+        The same read re-seeds the worksheet's attendance_stats counters.
+        """
+        rows = storage.load_attendance_rows(worksheet_name)
+        keys = {self.make_key(row[0], row[2]) for row in rows}
+        with self._lock:
+            self._keys[worksheet_name] = keys
+            self._synced_at[worksheet_name] = time.monotonic()
+        attendance_stats.seed(worksheet_name, rows)
+        log_event(logging.INFO, "attendance.indexed", "Indexed attendance keys", worksheet=worksheet_name, keys=len(keys))
+        return keys
+
+    def keys_for(self, worksheet_name: str):
+        """Return the key set for a worksheet, loading it if missing or stale"""
+        with self._lock:
+            keys = self._keys.get(worksheet_name)
+            stale = self._is_stale(worksheet_name)
+        if keys is None or stale:
+            metrics.inc("cache_lookups_total", cache="attendance_index", result="miss")
+            keys = self.load(worksheet_name)
+        else:
+            metrics.inc("cache_lookups_total", cache="attendance_index", result="hit")
+        return keys
+
+    def add(self, worksheet_name: str, keys):
+        """Record keys that were just appended to the worksheet"""
+        with self._lock:
+            self._keys.setdefault(worksheet_name, set()).update(keys)
+
+    def invalidate(self, worksheet_name: str = None):
+        """Force a reload on the next lookup for one worksheet, or all of them"""
+        with self._lock:
+            if worksheet_name is None:
+                self._synced_at.clear()
+            else:
+                self._synced_at.pop(worksheet_name, None)
+
+    def indexed_worksheets(self):
+        with self._lock:
+            return list(self._keys)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "keys": len(keys),
+                    "synced_seconds_ago": round(now - self._synced_at[name], 1) if name in self._synced_at else None
+                }
+                for name, keys in self._keys.items()
+            }
+
+# Shared duplicate index for the attendance spreadsheet
+attendance_index = AttendanceDuplicateIndex()
+
+def seed_attendance_stats():
+    """
+    Load every attendance worksheet not counted yet (which also fills its
+    duplicate index); returns the stats snapshot
+    """
+    for worksheet_name in ATTENDANCE_WORKSHEETS:
+        if attendance_stats.is_seeded(worksheet_name):
+            continue
+        with attendance_index.worksheet_lock(worksheet_name):
+            if not attendance_stats.is_seeded(worksheet_name):
+                attendance_index.load(worksheet_name)
+    return attendance_stats.snapshot()
+
+def resync_attendance_index():
+    """Reload the duplicate index for every worksheet that has been indexed so far"""
+    for worksheet_name in attendance_index.indexed_worksheets():
+        with attendance_index.worksheet_lock(worksheet_name):
+            attendance_index.load(worksheet_name)
+    return attendance_index.stats()
+
+def write_attendance_group(worksheet_name: str, entries: list):
+    """
+    Write validated attendance entries that all target the same worksheet.
+    Does one duplicate check and one append_rows call for the whole group.
+    Each entry is a dict with regno, name, day, event_type and category, plus
+    an optional timestamp (defaults to now).
+    Returns one result dict per entry, in the same order.
+    """
+    try:
+        error = storage.prepare_attendance_worksheet(worksheet_name)
+        if error:
+            return [error] * len(entries)
         
         # Get current timestamp
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Prepare the row data with name field
-        row_data = [regno, name, day, timestamp, event_type, category]
+        results = [None] * len(entries)
         
-        # Check if this regno and day combination already exists
-        all_records = worksheet.get_all_records()
-        duplicate_found = False
-        
-        for record in all_records:
-            if (str(record.get('Registration Number', '')).strip() == regno.strip() and 
-                str(record.get('Day', '')).strip() == day.strip()):
-                duplicate_found = True
-                break
-        
-        if duplicate_found:
-            return {
-                "error": "Duplicate entry",
-                "message": f"Attendance for regno {regno} on day {day} already recorded"
-            }
-        
-        # Append the new row
-        try:
-            worksheet.append_row(row_data)
-            print(f"Successfully added attendance for {regno} - {name}")
+        # Check-and-append must not interleave with another writer on this worksheet
+        with attendance_index.worksheet_lock(worksheet_name):
+            # (regno, day) pairs already in the sheet, from the in-memory index
+            existing_keys = attendance_index.keys_for(worksheet_name)
+            batch_keys = set()
+            rows_to_append = []
+            pending_positions = []
             
-            return {
+            for position, entry in enumerate(entries):
+                key = attendance_index.make_key(entry["regno"], entry["day"])
+                
+                # Duplicates against the sheet and within this batch
+                if key in existing_keys or key in batch_keys:
+                    results[position] = {
+                        "error": "Duplicate entry",
+                        "message": f"Attendance for regno {entry['regno']} on day {entry['day']} already recorded"
+                    }
+                    continue
+                
+                batch_keys.add(key)
+                rows_to_append.append([entry["regno"], entry["name"], entry["day"], entry.get("timestamp") or timestamp,
+                                       entry["event_type"], entry["category"]])
+                pending_positions.append(position)
+            
+            if rows_to_append:
+                try:
+                    storage.append_attendance_rows(worksheet_name, rows_to_append)
+                    attendance_index.add(worksheet_name, batch_keys)
+                    attendance_stats.record(worksheet_name, rows_to_append)
+                    log_event(logging.INFO, "attendance.saved", "Attendance rows appended",
+                              worksheet=worksheet_name, rows=len(rows_to_append))
+                except Exception as append_error:
+                    log_event(logging.ERROR, "attendance.append_failed", "Appending attendance rows failed",
+                              worksheet=worksheet_name, rows=len(rows_to_append), error=str(append_error))
+                    is_api_error = isinstance(append_error, gspread.exceptions.APIError)
+                    if not (is_api_error and getattr(append_error, "code", None) == 429):
+                        # The append may have been applied anyway (5xx, timeout, dropped
+                        # connection): re-read the sheet before the next write
+                        attendance_index.invalidate(worksheet_name)
+                    if is_api_error and "403" in str(append_error):
+                        error = {
+                            "error": "Permission denied",
+                            "message": "The service account doesn't have permission to write to this worksheet. Please ensure the service account has editor permissions on the spreadsheet."
+                        }
+                    elif is_api_error:
+                        error = {"error": f"API error saving attendance: {str(append_error)}"}
+                    else:
+                        error = {"error": f"Internal server error: {str(append_error)}"}
+                    for position in pending_positions:
+                        results[position] = error
+                    return results
+        
+        for position in pending_positions:
+            entry = entries[position]
+            results[position] = {
                 "success": True,
-                "message": f"Attendance recorded successfully for {regno} - {name}",
+                "message": f"Attendance recorded successfully for {entry['regno']} - {entry['name']}",
                 "data": {
-                    "regno": regno,
-                    "name": name,
-                    "day": day,
-                    "event_type": event_type,
-                    "category": category,
-                    "timestamp": timestamp,
+                    "regno": entry["regno"],
+                    "name": entry["name"],
+                    "day": entry["day"],
+                    "event_type": entry["event_type"],
+                    "category": entry["category"],
+                    "timestamp": entry.get("timestamp") or timestamp,
                     "worksheet": worksheet_name
                 }
             }
-        except gspread.exceptions.APIError as api_error:
-            if "403" in str(api_error):
-                return {
-                    "error": "Permission denied",
-                    "message": "The service account doesn't have permission to write to this worksheet. Please ensure the service account has editor permissions on the spreadsheet."
-                }
-            else:
-                return {"error": f"API error saving attendance: {str(api_error)}"}
+        
+        return results
         
     except Exception as e:
-        print(f"Error saving attendance: {str(e)}")
-        return {"error": f"Internal server error: {str(e)}"}
+        log_event(logging.ERROR, "attendance.failed", "Error saving attendance", exc_info=True,
+                  worksheet=worksheet_name, error=str(e))
+        return [{"error": f"Internal server error: {str(e)}"}] * len(entries)
+
+def save_attendance_to_sheets(regno: str, name: str, day: str, event_type: str, category: str = None):
+    target = resolve_attendance_target(regno, name, day, event_type, category)
+    if "error" in target:
+        return target
+    
+    entry = {
+        "regno": regno,
+        "name": name,
+        "day": day,
+        "event_type": event_type,
+        "category": target["category"]
+    }
+    return write_attendance_group(target["worksheet_name"], [entry])[0]
+
+def is_settled_attendance_result(result: dict):
+    """True if a write_attendance_group result is final: written, or rejected as a duplicate"""
+    return "success" in result or result.get("error") == "Duplicate entry"
+
+def write_attendance_batch(items: list):
+    """
+    Write validated (worksheet_name, entry) pairs with one write_attendance_group
+    call per worksheet. Returns one result dict per item, in the same order.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for position, (worksheet_name, entry) in enumerate(items):
+        groups.setdefault(worksheet_name, []).append((position, entry))
+    
+    for worksheet_name, group in groups.items():
+        group_results = write_attendance_group(worksheet_name, [entry for _, entry in group])
+        for (position, _), result in zip(group, group_results):
+            results[position] = result
+    return results
 
 def save_mass_attendance_to_sheets(attendance_records: list):
     """
     Save multiple attendance records to Google Sheets
+    Records are validated up front, grouped by target worksheet and written
+    with one duplicate check and one append per worksheet
     """
     try:
-        results = []
-        success_count = 0
-        error_count = 0
+        record_results = [None] * len(attendance_records)
+        valid_positions = []
+        items = []
         
-        for record in attendance_records:
-            result = save_attendance_to_sheets(
+        # Validate everything before touching the sheet
+        for position, record in enumerate(attendance_records):
+            target = resolve_attendance_target(
                 regno=record.regno,
-                name=record.name, 
+                name=record.name,
                 day=record.day,
                 event_type=record.event_type,
                 category=record.category
             )
             
+            if "error" in target:
+                record_results[position] = target
+                continue
+            
+            valid_positions.append(position)
+            items.append((target["worksheet_name"], {
+                "regno": record.regno,
+                "name": record.name,
+                "day": record.day,
+                "event_type": record.event_type,
+                "category": target["category"]
+            }))
+        
+        # One write per worksheet
+        retryable_count = 0
+        for position, result in zip(valid_positions, write_attendance_batch(items)):
+            record_results[position] = result
+            if not is_settled_attendance_result(result):
+                retryable_count += 1
+        
+        results = []
+        success_count = 0
+        error_count = 0
+        
+        for record, result in zip(attendance_records, record_results):
             if "success" in result:
                 success_count += 1
             else:
@@ -473,415 +2077,1440 @@ def save_mass_attendance_to_sheets(attendance_records: list):
             "summary": {
                 "total_records": len(attendance_records),
                 "successful": success_count,
-                "failed": error_count
+                "failed": error_count,
+                # Failed on API, permission or internal errors (not duplicates or validation): safe to retry
+                "retryable": retryable_count
             },
             "detailed_results": results
         }
         
     except Exception as e:
         return {"error": f"Error processing mass attendance: {str(e)}"}
-    try:
-        # Validation
-        if not regno or not day or not event_type:
-            return {"error": "Registration number, day, and event_type are required"}
-        
-        # Event type validation
-        if event_type.lower() not in ["bootcamp", "hackathon"]:
-            return {"error": "Invalid event_type. Use 'bootcamp' or 'hackathon'"}
-        
-        # Day validation based on event type
-        if event_type.lower() == "bootcamp":
-            if day not in ["1", "2", "3", "4", "5"]:
-                return {"error": "Invalid day for bootcamp. Use '1', '2', '3', '4', or '5'"}
-            # Category is required for bootcamp
-            if not category:
-                return {"error": "Category is required for bootcamp events"}
-        elif event_type.lower() == "hackathon":
-            if day not in ["1", "2"]:
-                return {"error": "Invalid day for hackathon. Use '1' or '2'"}
-            # Category is not needed for hackathon, set default
-            category = "General"
-        
-        # Load credentials (same as scan_google_sheets function)
-        print("Loading credentials for attendance saving...")
-        
-        if os.getenv('GOOGLE_PROJECT_ID'):
-            creds_info = {
-                "type": os.getenv('GOOGLE_CREDENTIALS_TYPE'),
-                "project_id": os.getenv('GOOGLE_PROJECT_ID'),
-                "private_key_id": os.getenv('GOOGLE_PRIVATE_KEY_ID'),
-                "private_key": os.getenv('GOOGLE_PRIVATE_KEY').replace('\\n', '\n'),
-                "client_email": os.getenv('GOOGLE_CLIENT_EMAIL'),
-                "client_id": os.getenv('GOOGLE_CLIENT_ID'),
-                "auth_uri": os.getenv('GOOGLE_AUTH_URI'),
-                "token_uri": os.getenv('GOOGLE_TOKEN_URI'),
-                "auth_provider_x509_cert_url": os.getenv('GOOGLE_AUTH_PROVIDER_X509_CERT_URL'),
-                "client_x509_cert_url": os.getenv('GOOGLE_CLIENT_X509_CERT_URL'),
-                "universe_domain": os.getenv('GOOGLE_UNIVERSE_DOMAIN')
-            }
+
+# Streaming attendance import: rows validated and written per chunk
+ATTENDANCE_IMPORT_CHUNK_ROWS = int(os.getenv("ATTENDANCE_IMPORT_CHUNK_ROWS", "500"))
+
+# Longest accepted line (or quoted CSV record) in an import file
+ATTENDANCE_IMPORT_MAX_LINE_CHARS = 65536
+
+# Import column names (lowercase, spaces as underscores) -> attendance field
+ATTENDANCE_IMPORT_COLUMNS = {
+    "regno": "regno",
+    "registration_number": "regno",
+    "reg_number": "regno",
+    "name": "name",
+    "day": "day",
+    "event_type": "event_type",
+    "category": "category",
+    "timestamp": "timestamp"
+}
+
+async def iter_text_lines(chunks):
+    """
+    Decode an async stream of UTF-8 bytes and yield (line_number, line)
+    without the line ending. Only the current partial line is buffered.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    number = 0
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            number += 1
+            yield number, line.rstrip("\r")
+        if len(buffer) > ATTENDANCE_IMPORT_MAX_LINE_CHARS:
+            raise ValueError(f"Line {number + 1} is longer than {ATTENDANCE_IMPORT_MAX_LINE_CHARS} characters")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield number + 1, buffer.rstrip("\r")
+
+# csv.Error message for a record that ends inside a quoted field
+CSV_OPEN_QUOTE_ERROR = "unexpected end of data"
+
+async def iter_csv_rows(lines):
+    """
+    Yield (line_number, {field: value}) from CSV lines with a header row.
+    The csv module decides where a record ends: a record that stops inside
+    a quoted field continues on the next line, and a malformed record
+    yields an error dict for its line.
+    """
+    columns = None
+    pending = None
+    start = 0
+    async for number, line in lines:
+        if pending is None:
+            pending, start = line, number
         else:
-            with open('credentials.json', 'r') as f:
-                creds_info = json.load(f)
+            pending += "\n" + line
+        try:
+            record = next(csv.reader([pending], strict=True), [])
+        except csv.Error as e:
+            if str(e) == CSV_OPEN_QUOTE_ERROR:
+                if len(pending) > ATTENDANCE_IMPORT_MAX_LINE_CHARS:
+                    raise ValueError(f"Unterminated quoted field starting on line {start}")
+                continue
+            pending = None
+            if columns is None:
+                raise ValueError(f"Malformed CSV header on line {start}: {str(e)}")
+            yield start, {"error": f"Malformed CSV row: {str(e)}"}
+            continue
+        pending = None
+        if not any(value.strip() for value in record):
+            continue
         
-        # Set up credentials with write permissions
-        scope = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
+        if columns is None:
+            columns = [ATTENDANCE_IMPORT_COLUMNS.get(value.strip().lower().replace(" ", "_")) for value in record]
+            missing = [field for field in ["regno", "name", "day", "event_type"] if field not in columns]
+            if missing:
+                raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+            continue
+        yield start, {field: value for field, value in zip(columns, record) if field}
+    
+    if pending is not None:
+        raise ValueError(f"Unterminated quoted field starting on line {start}")
+
+async def iter_ndjson_rows(lines):
+    """Yield (line_number, object) from NDJSON lines; a malformed line yields an error dict"""
+    async for number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, {"error": f"Invalid JSON: {str(e)}"}
+            continue
+        yield number, row if isinstance(row, dict) else {"error": "Each line must be a JSON object"}
+
+def resolve_import_row(row: dict):
+    """
+    Validate one imported row. Returns {"worksheet_name": ..., "entry": ...}
+    or an error dict. An optional timestamp keeps the time recorded offline.
+    """
+    if "error" in row:
+        return row
+    values = {field: str(value).strip() for field, value in row.items() if value is not None}
+    target = resolve_attendance_target(
+        regno=values.get("regno"),
+        name=values.get("name"),
+        day=values.get("day"),
+        event_type=values.get("event_type"),
+        category=values.get("category") or None
+    )
+    if "error" in target:
+        return target
+    
+    timestamp = values.get("timestamp") or None
+    if timestamp:
+        try:
+            datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return {"error": f"Invalid timestamp: {timestamp}. Use 'YYYY-MM-DD HH:MM:SS'"}
+    
+    return {
+        "worksheet_name": target["worksheet_name"],
+        "entry": {
+            "regno": values["regno"],
+            "name": values["name"],
+            "day": values["day"],
+            "event_type": values["event_type"],
+            "category": target["category"],
+            "timestamp": timestamp
+        }
+    }
+
+async def import_attendance_stream(chunks, import_format: str):
+    """
+    Parse, validate and write an attendance import chunk by chunk, yielding
+    one NDJSON progress line per chunk and a final summary line. Only the
+    current chunk is held in memory, however large the upload is.
+    """
+    started = time.perf_counter()
+    summary = {"total_records": 0, "successful": 0, "failed": 0}
+    lines = iter_text_lines(chunks)
+    rows = iter_csv_rows(lines) if import_format == "csv" else iter_ndjson_rows(lines)
+    chunk_number = 0
+    
+    async def write_chunk(chunk):
+        resolved = [(number, row.get("regno"), resolve_import_row(row)) for number, row in chunk]
+        valid = [(target["worksheet_name"], target["entry"]) for _, _, target in resolved if "error" not in target]
+        written = iter(await run_sheets_write(write_attendance_batch, valid) if valid else [])
         
-        creds = Credentials.from_service_account_info(creds_info, scopes=scope)
-        client = gspread.authorize(creds)
+        errors = []
+        for number, regno, target in resolved:
+            result = target if "error" in target else next(written)
+            if "success" in result:
+                summary["successful"] += 1
+            else:
+                summary["failed"] += 1
+                errors.append({"line": number, "regno": regno, "result": result})
+        summary["total_records"] += len(chunk)
+        return errors
+    
+    try:
+        chunk = []
+        async for number, row in rows:
+            chunk.append((number, row))
+            if len(chunk) < ATTENDANCE_IMPORT_CHUNK_ROWS:
+                continue
+            chunk_number += 1
+            errors = await write_chunk(chunk)
+            chunk = []
+            yield json.dumps({"event": "progress", "chunk": chunk_number, **summary, "errors": errors}) + "\n"
+        if chunk:
+            chunk_number += 1
+            errors = await write_chunk(chunk)
+            yield json.dumps({"event": "progress", "chunk": chunk_number, **summary, "errors": errors}) + "\n"
+    except ValueError as e:
+        # Unreadable file structure: report it and stop, keeping what was already written
+        log_event(logging.WARNING, "attendance.import_failed", "Attendance import stopped", error=str(e), **summary)
+        yield json.dumps({"event": "error", "error": str(e), **summary}) + "\n"
+        return
+    
+    log_event(logging.INFO, "attendance.imported", "Attendance import finished", format=import_format,
+              chunks=chunk_number, seconds=round(time.perf_counter() - started, 3), **summary)
+    yield json.dumps({
+        "event": "done",
+        "message": f"Attendance import completed. Success: {summary['successful']}, Errors: {summary['failed']}",
+        "summary": summary,
+        "chunks": chunk_number,
+        "seconds": round(time.perf_counter() - started, 3)
+    }) + "\n"
+
+# Write-behind journal for queued attendance
+ATTENDANCE_JOURNAL_PATH = os.getenv("ATTENDANCE_JOURNAL_PATH", "attendance_journal.db")
+ATTENDANCE_FLUSH_INTERVAL_SECONDS = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL_SECONDS", "2"))
+ATTENDANCE_FLUSH_BATCH_SIZE = int(os.getenv("ATTENDANCE_FLUSH_BATCH_SIZE", "500"))
+# Failed flushes before an entry is parked as 'failed', and the cap on the doubling retry delay
+ATTENDANCE_FLUSH_MAX_ATTEMPTS = int(os.getenv("ATTENDANCE_FLUSH_MAX_ATTEMPTS", "8"))
+ATTENDANCE_FLUSH_MAX_BACKOFF_SECONDS = float(os.getenv("ATTENDANCE_FLUSH_MAX_BACKOFF_SECONDS", "300"))
+
+class AttendanceJournal:
+    """
+    Append-only SQLite journal of validated attendance records waiting to be
+    written to Google Sheets. Rows start as 'pending' and end up 'flushed'
+    (written), 'rejected' (e.g. duplicate) or 'failed' (still erroring after
+    ATTENDANCE_FLUSH_MAX_ATTEMPTS tries). Pending rows survive restarts.
+    """
+
+    def __init__(self, path=ATTENDANCE_JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_journal (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                worksheet TEXT NOT NULL,
+                regno TEXT NOT NULL,
+                name TEXT NOT NULL,
+                day TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                category TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                result TEXT
+            )
+        """)
+        # Journals created before retry backoff existed
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(attendance_journal)")]
+        if "next_attempt_at" not in columns:
+            try:
+                self._conn.execute("ALTER TABLE attendance_journal ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                # Another worker process migrated the same file first
+                pass
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_journal_status ON attendance_journal (status, id)")
+        self._conn.commit()
+        self.last_flush_at = None
+        self.last_error = None
+
+    def enqueue(self, entries: list):
+        """Durably store entries (dicts with worksheet, regno, name, day, event_type, category, timestamp); returns their ids"""
+        with self._lock:
+            ids = []
+            with self._conn:
+                for entry in entries:
+                    cursor = self._conn.execute(
+                        "INSERT INTO attendance_journal (worksheet, regno, name, day, event_type, category, timestamp) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (entry["worksheet"], entry["regno"], entry["name"], entry["day"],
+                         entry["event_type"], entry["category"], entry["timestamp"])
+                    )
+                    ids.append(cursor.lastrowid)
+            return ids
+
+    def pending(self, limit: int = ATTENDANCE_FLUSH_BATCH_SIZE):
+        """Oldest pending entries due for a try, as dicts including their journal id and attempts so far"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, worksheet, regno, name, day, event_type, category, timestamp, attempts "
+                "FROM attendance_journal WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        columns = ["id", "worksheet", "regno", "name", "day", "event_type", "category", "timestamp", "attempts"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def record_results(self, outcomes: list):
+        """Store (id, status, result_dict, next_attempt_at) outcomes from a flush"""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE attendance_journal SET status = ?, attempts = attempts + 1, next_attempt_at = ?, result = ? "
+                    "WHERE id = ?",
+                    [(status, next_attempt_at, json.dumps(result), entry_id)
+                     for entry_id, status, result, next_attempt_at in outcomes]
+                )
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM attendance_journal GROUP BY status").fetchall()
+        counts = {"pending": 0, "flushed": 0, "rejected": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+_attendance_journal = None
+_attendance_journal_lock = threading.Lock()
+
+def get_attendance_journal():
+    """Open the attendance journal on first use (request threads and the flusher may race here)"""
+    global _attendance_journal
+    if _attendance_journal is None:
+        with _attendance_journal_lock:
+            if _attendance_journal is None:
+                _attendance_journal = AttendanceJournal()
+    return _attendance_journal
+
+def attendance_journal_counts():
+    """Journal entry counts per status (blocking SQLite query, run it off the event loop)"""
+    return get_attendance_journal().counts()
+
+def queue_mass_attendance(attendance_records: list):
+    """
+    Validate attendance records and store the valid ones in the local journal.
+    The background flusher writes them to Google Sheets later.
+    """
+    try:
+        journal = get_attendance_journal()
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        record_results = [None] * len(attendance_records)
+        entries = []
+        positions = []
         
-        # Attendance spreadsheet ID (from the provided link)
-        attendance_sheet_id = "1Nw0GzQuxKZYefPGPRvcQZk4RlkRnZLsIwPc6RD7SPBI"
+        for position, record in enumerate(attendance_records):
+            target = resolve_attendance_target(
+                regno=record.regno,
+                name=record.name,
+                day=record.day,
+                event_type=record.event_type,
+                category=record.category
+            )
+            
+            if "error" in target:
+                record_results[position] = target
+                continue
+            
+            entries.append({
+                "worksheet": target["worksheet_name"],
+                "regno": record.regno,
+                "name": record.name,
+                "day": record.day,
+                "event_type": record.event_type,
+                "category": target["category"],
+                "timestamp": timestamp
+            })
+            positions.append(position)
         
-        # Open the attendance spreadsheet
-        spreadsheet = client.open_by_key(attendance_sheet_id)
-        print(f"Successfully opened attendance spreadsheet: {spreadsheet.title}")
+        for position, entry, journal_id in zip(positions, entries, journal.enqueue(entries)):
+            record_results[position] = {
+                "success": True,
+                "queued": True,
+                "message": f"Attendance queued for {entry['regno']} - {entry['name']}",
+                "journal_id": journal_id,
+                "data": {
+                    "regno": entry["regno"],
+                    "name": entry["name"],
+                    "day": entry["day"],
+                    "event_type": entry["event_type"],
+                    "category": entry["category"],
+                    "timestamp": timestamp,
+                    "worksheet": entry["worksheet"]
+                }
+            }
         
-        # Determine which worksheet to use based on event_type and category
-        worksheet_name = None
+        queued_count = len(entries)
+        error_count = len(attendance_records) - queued_count
         
-        if event_type.lower() == "bootcamp":
-            if category.lower() in ["ai/ml", "ai", "ml", "artificial intelligence", "machine learning"]:
-                worksheet_name = "AI/ML Bootcamp"
-            elif category.lower() in ["cyber", "cybersecurity", "security"]:
-                worksheet_name = "Cyber Bootcamp"
-            elif category.lower() in ["full stack", "fullstack", "web development", "web dev"]:
-                worksheet_name = "Full Stack Development"
-            else:
-                return {"error": f"Invalid bootcamp category: {category}. Use 'AI/ML', 'Cyber', or 'Full Stack'"}
+        return {
+            "success": True,
+            "message": f"Mass attendance queued. Queued: {queued_count}, Errors: {error_count}",
+            "summary": {
+                "total_records": len(attendance_records),
+                "queued": queued_count,
+                "failed": error_count
+            },
+            "detailed_results": [
+                {"regno": record.regno, "name": record.name, "result": result}
+                for record, result in zip(attendance_records, record_results)
+            ]
+        }
         
-        elif event_type.lower() == "hackathon":
-            if day == "1":
-                worksheet_name = "Hackathon Day 1"
-            elif day == "2":
-                worksheet_name = "Hackathon Day 2"
+    except Exception as e:
+        return {"error": f"Error queueing mass attendance: {str(e)}"}
+
+def flush_attendance_journal(batch_size: int = ATTENDANCE_FLUSH_BATCH_SIZE):
+    """
+    Write pending journal entries to Google Sheets, one append per worksheet.
+    Successful rows become 'flushed', duplicates 'rejected'; anything else
+    (API errors, outages) stays 'pending' and is retried after a doubling
+    delay, until ATTENDANCE_FLUSH_MAX_ATTEMPTS tries mark it 'failed'.
+    Backed-off entries are skipped, so they cannot hold up newer check-ins.
+    Returns the number of entries processed.
+    """
+    journal = get_attendance_journal()
+    pending = journal.pending(batch_size)
+    if not pending:
+        return 0
+    
+    groups = {}
+    for entry in pending:
+        groups.setdefault(entry["worksheet"], []).append(entry)
+    
+    outcomes = []
+    now = time.time()
+    for worksheet_name, group in groups.items():
+        for entry, result in zip(group, write_attendance_group(worksheet_name, group)):
+            if "success" in result:
+                outcomes.append((entry["id"], "flushed", result, 0))
+            elif is_settled_attendance_result(result):
+                outcomes.append((entry["id"], "rejected", result, 0))
+            elif entry["attempts"] + 1 >= ATTENDANCE_FLUSH_MAX_ATTEMPTS:
+                journal.last_error = result.get("message") or result.get("error")
+                log_event(logging.ERROR, "journal.entry_failed", "Queued attendance gave up after repeated errors",
+                          journal_id=entry["id"], worksheet=worksheet_name, regno=entry["regno"],
+                          attempts=entry["attempts"] + 1, error=journal.last_error)
+                outcomes.append((entry["id"], "failed", result, 0))
             else:
-                return {"error": f"Invalid hackathon day: {day}. Only days 1-2 are supported for hackathon."}
-        
-        else:
-            return {"error": f"Invalid event type: {event_type}. Use 'bootcamp' or 'hackathon'"}
-        
-        # Try to find the worksheet
+                journal.last_error = result.get("message") or result.get("error")
+                delay = min(ATTENDANCE_FLUSH_MAX_BACKOFF_SECONDS, ATTENDANCE_FLUSH_INTERVAL_SECONDS * (2 ** entry["attempts"]))
+                outcomes.append((entry["id"], "pending", result, now + delay))
+    
+    journal.record_results(outcomes)
+    journal.last_flush_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_event(logging.INFO, "journal.flushed", "Flushed attendance journal",
+              settled=sum(1 for _, status, _, _ in outcomes if status != "pending"), entries=len(outcomes))
+    return len(outcomes)
+
+async def attendance_flusher():
+    """Background task draining the attendance journal into Google Sheets"""
+    while True:
         try:
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            print(f"Found existing worksheet: {worksheet_name}")
-        except gspread.WorksheetNotFound:
-            # If worksheet doesn't exist, try to create it
-            try:
-                print(f"Worksheet '{worksheet_name}' not found. Attempting to create it...")
-                worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=1000, cols=10)
-                # Add headers
-                headers = ["Registration Number", "Day", "Timestamp", "Event Type", "Category"]
-                worksheet.append_row(headers)
-                print(f"Successfully created worksheet: {worksheet_name}")
-            except gspread.exceptions.APIError as api_error:
-                if "403" in str(api_error):
-                    return {
-                        "error": "Permission denied",
-                        "message": f"The service account doesn't have permission to create worksheet '{worksheet_name}'. Please ensure the service account has editor permissions on the spreadsheet, or manually create the worksheet with headers: Registration Number, Day, Timestamp, Event Type, Category"
-                    }
-                else:
-                    return {"error": f"API error creating worksheet: {str(api_error)}"}
-            except Exception as create_error:
-                return {"error": f"Error creating worksheet: {str(create_error)}"}
+            # Keep going while full batches are coming out, then wait for more
+            while await run_sheets_write(flush_attendance_journal) >= ATTENDANCE_FLUSH_BATCH_SIZE:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Not get_attendance_journal(): opening it may be what failed, and it blocks
+            if _attendance_journal is not None:
+                _attendance_journal.last_error = str(e)
+            log_event(logging.ERROR, "journal.flush_failed", "Attendance flush failed", error=str(e))
+        await asyncio.sleep(ATTENDANCE_FLUSH_INTERVAL_SECONDS)
+
+def normalize_roster_category(category: str):
+    """
+    Map a user-supplied category to "ai/ml", "cyber" or "full stack" (None if unknown)
+    """
+    category_lower = category.lower().strip()
+    if category_lower in ["ai/ml", "ai", "ml", "aiml"]:
+        return "ai/ml"
+    if category_lower in ["cyber", "cybersecurity", "security"]:
+        return "cyber"
+    if category_lower in ["full stack", "fullstack", "full-stack"]:
+        return "full stack"
+    return None
+
+# Batch sheets behind each roster category
+CATEGORY_SOURCES = {
+    "ai/ml": [("AI/ML", AIML_BATCH_GID)],
+    "cyber": [("Cyber", CYBER_BATCH_GID)],
+    "full stack": [("AI/ML", AIML_BATCH_GID), ("Cyber", CYBER_BATCH_GID)]
+}
+
+def extract_roster_teams(header_row, columns, data_rows):
+    """
+    Project roster rows into team dicts; returns (teams, None) or (None, error_dict)
+    """
+    if header_row is None:
+        return None, {"error": "No data found in the sheet"}
+    
+    if columns["team_name"] is None:
+        return None, {"error": "Could not find team name column"}
+    
+    # Extract team data with all available information
+    teams_data = []
+    max_col = max(col for col in columns.values() if col is not None)
+    projection = [(field, columns[field]) for field in ROSTER_FIELDS[1:]]
+    team_name_col = columns["team_name"]
+    debug_rows = logger.isEnabledFor(logging.DEBUG)
+    
+    for row_idx, row in enumerate(data_rows, 1):
+        if len(row) > max_col:
+            team_name = row[team_name_col].strip()
+            
+            if team_name:  # Only include rows with team name
+                team_entry = {'team_name': team_name}
+                for field, col in projection:
+                    team_entry[field] = row[col].strip() if col is not None else "Not specified"
+                teams_data.append(team_entry)
+                if debug_rows:
+                    log_event(logging.DEBUG, "roster.row", "Roster row", row=row_idx, **team_entry)
+    
+    return teams_data, None
+
+def get_teams_by_category(category: str):
+    """
+    Retrieve team names and team leaders from specific Google Sheets based on category
+    Full Stack combines the AI/ML and Cyber sheets, fetched together in one batched read
+    """
+    try:
         
-        # Get current timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Determine which worksheet(s) to use based on category
+        category_key = normalize_roster_category(category)
+        if category_key is None:
+            return {"error": f"Invalid category: {category}. Use 'AI/ML', 'Cyber', or 'Full Stack'"}
+        sources = CATEGORY_SOURCES[category_key]
         
-        # Prepare the row data
-        row_data = [regno, day, timestamp, event_type, category]
+        # Same spreadsheet as scan_google_sheets, via the shared client
+        spreadsheet = sheets_manager.open_spreadsheet(REGISTRATION_SHEET_ID)
         
-        # Check if this regno and day combination already exists
-        all_records = worksheet.get_all_records()
-        duplicate_found = False
+        # Find the target worksheets in the cached worksheet list
+        targets = []
+        for _, gid in sources:
+            worksheet = worksheet_directory.by_gid(REGISTRATION_SHEET_ID, gid)
+            if worksheet is None:
+                if category_key == "full stack":
+                    return {"error": "Failed to fetch data from AI/ML or Cyber sheets"}
+                return {"error": f"Worksheet with gid {gid} not found for category {category}"}
+            targets.append((worksheet, "roster"))
         
-        for record in all_records:
-            if (str(record.get('Registration Number', '')).strip() == regno.strip() and 
-                str(record.get('Day', '')).strip() == day.strip()):
-                duplicate_found = True
-                break
+        # One batched read for every sheet, merged in memory
+        combined_teams = []
+        for header_row, columns, data_rows in read_worksheets_columns(spreadsheet, targets):
+            teams, error = extract_roster_teams(header_row, columns, data_rows)
+            if error:
+                if category_key == "full stack":
+                    return {"error": "Failed to fetch data from AI/ML or Cyber sheets"}
+                return error
+            combined_teams.extend(teams)
         
-        if duplicate_found:
-            return {
-                "error": "Duplicate entry",
-                "message": f"Attendance for regno {regno} on day {day} already recorded"
-            }
+        log_event(logging.INFO, "roster.loaded", "Loaded teams by category", category=category,
+                  worksheets=[worksheet.title for worksheet, _ in targets], teams=len(combined_teams))
         
-        # Append the new row
-        try:
-            worksheet.append_row(row_data)
-            print(f"Successfully added attendance for {regno}")
-            
+        if category_key == "full stack":
             return {
                 "success": True,
-                "message": f"Attendance recorded successfully for {regno}",
-                "data": {
-                    "regno": regno,
-                    "day": day,
-                    "event_type": event_type,
-                    "category": category,
-                    "timestamp": timestamp,
-                    "worksheet": worksheet_name
-                }
+                "category": "Full Stack",
+                "count": len(combined_teams),
+                "teams": combined_teams,
+                "sources": [name for name, _ in sources]
             }
-        except gspread.exceptions.APIError as api_error:
-            if "403" in str(api_error):
-                return {
-                    "error": "Permission denied",
-                    "message": "The service account doesn't have permission to write to this worksheet. Please ensure the service account has editor permissions on the spreadsheet."
-                }
-            else:
-                return {"error": f"API error saving attendance: {str(api_error)}"}
+        
+        return {
+            "success": True,
+            "category": category,
+            "count": len(combined_teams),
+            "teams": combined_teams
+        }
         
     except Exception as e:
-        print(f"Error saving attendance: {str(e)}")
+        log_event(logging.ERROR, "roster.failed", "Error fetching teams by category", exc_info=True,
+                  category=category, error=str(e))
         return {"error": f"Internal server error: {str(e)}"}
 
-def get_teams_by_category(category: str):
+class StorageBackend(ABC):
     """
-    Retrieve team names and team leaders from specific Google Sheets based on category
+    Interface between the API and where rosters and attendance live.
+    Attendance worksheets are addressed by their names in ATTENDANCE_WORKSHEETS.
+    A backend missing one of the abstract methods fails when it is created.
     """
-    try:
-        # Load credentials (same as other functions)
-        print(f"Loading credentials for category: {category}")
-        
-        if os.getenv('GOOGLE_PROJECT_ID'):
-            creds_info = {
-                "type": os.getenv('GOOGLE_CREDENTIALS_TYPE'),
-                "project_id": os.getenv('GOOGLE_PROJECT_ID'),
-                "private_key_id": os.getenv('GOOGLE_PRIVATE_KEY_ID'),
-                "private_key": os.getenv('GOOGLE_PRIVATE_KEY').replace('\\n', '\n'),
-                "client_email": os.getenv('GOOGLE_CLIENT_EMAIL'),
-                "client_id": os.getenv('GOOGLE_CLIENT_ID'),
-                "auth_uri": os.getenv('GOOGLE_AUTH_URI'),
-                "token_uri": os.getenv('GOOGLE_TOKEN_URI'),
-                "auth_provider_x509_cert_url": os.getenv('GOOGLE_AUTH_PROVIDER_X509_CERT_URL'),
-                "client_x509_cert_url": os.getenv('GOOGLE_CLIENT_X509_CERT_URL'),
-                "universe_domain": os.getenv('GOOGLE_UNIVERSE_DOMAIN')
-            }
-        else:
-            with open('credentials.json', 'r') as f:
-                creds_info = json.load(f)
-        
-        # Set up credentials
-        scope = [
-            'https://www.googleapis.com/auth/spreadsheets',
-            'https://www.googleapis.com/auth/drive'
-        ]
-        
-        creds = Credentials.from_service_account_info(creds_info, scopes=scope)
-        client = gspread.authorize(creds)
-        
-        # Same spreadsheet ID as the original function
-        sheet_id = "1I7ddC_ij6L0fnkowLMBjxiZzKF7eICEktYobUXpPCVI"
-        spreadsheet = client.open_by_key(sheet_id)
-        
-        # Determine which worksheet to use based on category
-        target_gid = None
-        category_lower = category.lower()
-        
-        if category_lower in ["ai/ml", "ai", "ml", "aiml"]:
-            target_gid = "1880278751"  # AI/ML batch sheet
-            print("Using AI/ML batch sheet")
-        elif category_lower in ["cyber", "cybersecurity", "security"]:
-            target_gid = "1671574899"  # Cyber batch sheet
-            print("Using Cyber batch sheet")
-        elif category_lower in ["full stack", "fullstack", "full-stack"]:
-            # For full stack, we'll return data from both AI/ML and Cyber sheets
-            print("Full stack requested - will fetch from both AI/ML and Cyber sheets")
-            aiml_data = get_teams_by_category("ai/ml")
-            cyber_data = get_teams_by_category("cyber")
-            
-            if aiml_data and cyber_data and "teams" in aiml_data and "teams" in cyber_data:
-                combined_teams = aiml_data["teams"] + cyber_data["teams"]
-                return {
-                    "success": True,
-                    "category": "Full Stack",
-                    "count": len(combined_teams),
-                    "teams": combined_teams,
-                    "sources": ["AI/ML", "Cyber"]
-                }
-            else:
-                return {"error": "Failed to fetch data from AI/ML or Cyber sheets"}
-        else:
+
+    name = None
+
+    def warm_up(self):
+        """Prepare connections before the first request"""
+
+    @abstractmethod
+    def get_teams(self):
+        """Main teams list (same shape as scan_google_sheets), or None on failure"""
+
+    @abstractmethod
+    def get_teams_by_category(self, category: str):
+        """Teams of a category (same shape as get_teams_by_category)"""
+
+    @abstractmethod
+    def ensure_attendance_worksheets(self):
+        """Make sure every attendance worksheet exists; returns a provisioning report"""
+
+    def roster_version(self):
+        """Cheap token that changes whenever the rosters may have changed (None if unknown)"""
+        return None
+
+    @abstractmethod
+    def prepare_attendance_worksheet(self, worksheet_name: str):
+        """Return None if the worksheet can be written to, else an error dict"""
+
+    @abstractmethod
+    def load_attendance_rows(self, worksheet_name: str):
+        """Every row recorded in a worksheet, laid out like ATTENDANCE_HEADERS"""
+
+    @abstractmethod
+    def append_attendance_rows(self, worksheet_name: str, rows: list):
+        """Append rows laid out like ATTENDANCE_HEADERS"""
+
+class SheetsStorageBackend(StorageBackend):
+    """Google Sheets through gspread, or the in-memory stand-in when STORAGE_BACKEND=fake_sheets"""
+
+    def __init__(self, name="gspread"):
+        self.name = name
+
+    def warm_up(self):
+        sheets_manager.warm_up()
+
+    def get_teams(self):
+        return scan_google_sheets()
+
+    def get_teams_by_category(self, category: str):
+        return get_teams_by_category(category)
+
+    def ensure_attendance_worksheets(self):
+        return provision_attendance_worksheets()
+
+    def roster_version(self):
+        # Drive modifiedTime of the registration spreadsheet: one metadata call, no cell values
+        spreadsheet = sheets_manager.open_spreadsheet(REGISTRATION_SHEET_ID)
+        return sheets_scheduler.read(spreadsheet.get_lastUpdateTime)
+
+    def prepare_attendance_worksheet(self, worksheet_name: str):
+        spreadsheet = sheets_manager.open_spreadsheet(ATTENDANCE_SHEET_ID)
+        _, error = get_attendance_worksheet(spreadsheet, worksheet_name)
+        return error
+
+    def load_attendance_rows(self, worksheet_name: str):
+        worksheet = worksheet_directory.by_title(ATTENDANCE_SHEET_ID, worksheet_name)
+        return [[record.get(header, '') for header in ATTENDANCE_HEADERS]
+                for record in sheets_scheduler.read(worksheet.get_all_records)]
+
+    def append_attendance_rows(self, worksheet_name: str, rows: list):
+        worksheet = worksheet_directory.by_title(ATTENDANCE_SHEET_ID, worksheet_name)
+        sheets_scheduler.write(worksheet.append_rows, rows)
+
+# Local database used when STORAGE_BACKEND=sqlite
+STORAGE_SQLITE_PATH = os.getenv("STORAGE_SQLITE_PATH", "innovatex.db")
+
+class SqliteStorageBackend(StorageBackend):
+    """
+    Rosters and attendance in a local SQLite database. An empty database is
+    seeded with DEMO_TEAMS_PER_SHEET sample teams per roster sheet.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=STORAGE_SQLITE_PATH, teams_per_sheet=DEMO_TEAMS_PER_SHEET):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS roster_teams (
+                    gid TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    team_name TEXT NOT NULL,
+                    domains TEXT NOT NULL DEFAULT '',
+                    team_leader TEXT NOT NULL DEFAULT '',
+                    team_member1 TEXT NOT NULL DEFAULT '',
+                    team_member2 TEXT NOT NULL DEFAULT '',
+                    reg_leader TEXT NOT NULL DEFAULT '',
+                    reg_member1 TEXT NOT NULL DEFAULT '',
+                    reg_member2 TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (gid, position)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS attendance (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    worksheet TEXT NOT NULL,
+                    regno TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    category TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_worksheet ON attendance (worksheet, regno, day)")
+        if teams_per_sheet and not self._conn.execute("SELECT 1 FROM roster_teams LIMIT 1").fetchone():
+            self.seed(build_demo_rosters(teams_per_sheet))
+
+    def seed(self, rosters: dict):
+        """Load {gid: rows-with-header} roster data using the same column resolution as the Sheets reader"""
+        with self._lock, self._conn:
+            for gid, rows in rosters.items():
+                kind = "teams" if gid == TEAMS_GID else "roster"
+                columns = COLUMN_RESOLVERS[kind](rows[0])
+                for position, row in enumerate(rows[1:]):
+                    fields = {field: row[col].strip() for field, col in columns.items() if col is not None}
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO roster_teams (gid, position, team_name, domains, team_leader, team_member1, "
+                        "team_member2, reg_leader, reg_member1, reg_member2) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (gid, position, fields.get("team_name", ""), fields.get("domains", ""), fields.get("team_leader", ""),
+                         fields.get("team_member1", ""), fields.get("team_member2", ""), fields.get("reg_leader", ""),
+                         fields.get("reg_member1", ""), fields.get("reg_member2", ""))
+                    )
+
+    def _query(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get_teams(self):
+        team_data = []
+        for team_name, domains, team_leader in self._query(
+                "SELECT team_name, domains, team_leader FROM roster_teams WHERE gid = ? ORDER BY position", (TEAMS_GID,)):
+            if team_name and domains:
+                team_entry = {'team_name': team_name, 'domains': domains}
+                if team_leader:
+                    team_entry['team_leader'] = team_leader
+                team_data.append(team_entry)
+        return team_data
+
+    def get_teams_by_category(self, category: str):
+        category_key = normalize_roster_category(category)
+        if category_key is None:
             return {"error": f"Invalid category: {category}. Use 'AI/ML', 'Cyber', or 'Full Stack'"}
         
-        # Get worksheets and find the target one
-        worksheets = spreadsheet.worksheets()
-        target_worksheet = None
-        
-        for worksheet in worksheets:
-            if str(worksheet.id) == target_gid:
-                target_worksheet = worksheet
-                break
+        sources = CATEGORY_SOURCES[category_key]
+        teams = []
+        for _, gid in sources:
+            for row in self._query(
+                    "SELECT team_name, team_leader, team_member1, team_member2, reg_leader, reg_member1, reg_member2 "
+                    "FROM roster_teams WHERE gid = ? ORDER BY position", (gid,)):
+                if row[0]:
+                    teams.append({field: (value or "Not specified") for field, value in zip(ROSTER_FIELDS, row)})
         
-        if not target_worksheet:
-            return {"error": f"Worksheet with gid {target_gid} not found for category {category}"}
-        
-        print(f"Found target worksheet: {target_worksheet.title}")
+        if category_key == "full stack":
+            return {
+                "success": True,
+                "category": "Full Stack",
+                "count": len(teams),
+                "teams": teams,
+                "sources": [name for name, _ in sources]
+            }
+        return {"success": True, "category": category, "count": len(teams), "teams": teams}
+
+    def ensure_attendance_worksheets(self):
+        # Every worksheet is a slice of the attendance table, so there is nothing to create
+        global provisioning_report
+        provisioning_report = {
+            "checked_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "created": [],
+            "headers_written": [],
+            "drift": {},
+            "error": None
+        }
+        return provisioning_report
+
+    def roster_version(self):
+        # Changes when another connection (e.g. an admin editing rosters) commits to the database
+        return str(self._query("PRAGMA data_version")[0][0])
+
+    def prepare_attendance_worksheet(self, worksheet_name: str):
+        if worksheet_name not in ATTENDANCE_WORKSHEETS:
+            return {"error": f"Unknown attendance worksheet: {worksheet_name}"}
+        return None
+
+    def load_attendance_rows(self, worksheet_name: str):
+        return self._query("SELECT regno, name, day, timestamp, event_type, category FROM attendance WHERE worksheet = ?",
+                           (worksheet_name,))
+
+    def append_attendance_rows(self, worksheet_name: str, rows: list):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO attendance (worksheet, regno, name, day, timestamp, event_type, category) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(worksheet_name, *row) for row in rows]
+            )
+
+def create_storage_backend(name: str = STORAGE_BACKEND):
+    """Build the storage backend selected by STORAGE_BACKEND"""
+    if name in ("gspread", "sheets", "fake_sheets"):
+        return SheetsStorageBackend(name)
+    if name == "sqlite":
+        return SqliteStorageBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {name}. Use 'gspread', 'sqlite' or 'fake_sheets'")
+
+# Shared storage backend used by every read and write path
+storage = create_storage_backend()
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    blocking function on the Sheets executor, later callers await the same result.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.coalesced = 0
+
+    async def do(self, key, func, *args):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield so one cancelled waiter doesn't cancel the shared fetch
+            return await asyncio.shield(future)
         
-        # Get all values from the sheet
-        all_values = target_worksheet.get_all_values()
+        future = asyncio.ensure_future(run_sheets_call(func, *args))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+# Shared single-flight group for sheet reads
+sheet_reads = SingleFlight()
+
+# Seconds a cached roster is considered fresh; stale copies are served while one refresh runs
+ROSTER_CACHE_TTL_SECONDS = float(os.getenv("ROSTER_CACHE_TTL_SECONDS", "60"))
+ROSTER_CACHE_MAX_ENTRIES = 64
+
+def is_cacheable_roster(value):
+    """Only successful sheet reads are cached"""
+    return value is not None and not (isinstance(value, dict) and "error" in value)
+
+# Last good rosters are kept on disk so a cold start can serve them immediately
+ROSTER_SNAPSHOT_PATH = os.getenv("ROSTER_SNAPSHOT_PATH", "roster_snapshot.json")
+ROSTER_SNAPSHOT_VERSION = 1
+
+def load_roster(category: str = None):
+    """
+    Read one roster from the storage backend: the main teams sheet when category
+    is None, otherwise the category's batch sheet(s)
+    """
+    if category is None:
+        return storage.get_teams()
+    return storage.get_teams_by_category(category)
+
+# Seconds a roster change check (spreadsheet modifiedTime) is reused across rosters
+ROSTER_CHANGE_CHECK_SECONDS = float(os.getenv("ROSTER_CHANGE_CHECK_SECONDS", "5"))
+
+def roster_teams(value):
+    """Team list inside a cached roster: /teams caches a list, categories a response dict"""
+    return value["teams"] if isinstance(value, dict) else value
+
+def with_roster_teams(value, teams: list):
+    """Copy of a cached roster value with its team list replaced"""
+    if isinstance(value, dict):
+        return {**value, "teams": teams, "count": len(teams)}
+    return teams
+
+def roster_row_key(team: dict):
+    """Identity of a roster row across reloads: team name plus leader"""
+    return (team.get("team_name"), team.get("reg_leader", team.get("team_leader")))
+
+def diff_rosters(old_teams: list, new_teams: list):
+    """
+    Row-level diff of two team lists. Returns (merged, diff): merged is
+    new_teams in sheet order but reusing the old dict for every unchanged
+    row, so indexes that point at those dicts stay valid; diff lists the
+    added, removed and changed ((old, new)) rows.
+    """
+    previous_by_key = {}
+    for team in old_teams:
+        previous_by_key.setdefault(roster_row_key(team), []).append(team)
+    
+    merged, added, changed = [], [], []
+    for team in new_teams:
+        candidates = previous_by_key.get(roster_row_key(team))
+        previous = candidates.pop(0) if candidates else None
+        if previous is None:
+            added.append(team)
+            merged.append(team)
+        elif previous == team:
+            merged.append(previous)
+        else:
+            changed.append((previous, team))
+            merged.append(team)
+    removed = [team for candidates in previous_by_key.values() for team in candidates]
+    return merged, {"added": added, "removed": removed, "changed": changed}
+
+class RosterCache:
+    """
+    Read-through cache for roster reads, keyed by (sheet ID, gid).
+    Fresh entries are returned directly. Stale entries are returned at once
+    while a single background refresh replaces them. Every newly loaded
+    roster is also written to an on-disk snapshot, which is read back at
+    startup so the first requests are served without touching Google.
+    A refresh first compares the storage backend's roster version with the
+    one the entry was loaded at and skips the download when nothing changed;
+    otherwise the new rows are diffed against the cached ones and the diff
+    is passed to the registered listeners.
+    """
+
+    def __init__(self, ttl_seconds=ROSTER_CACHE_TTL_SECONDS, max_entries=ROSTER_CACHE_MAX_ENTRIES,
+                 snapshot_path=ROSTER_SNAPSHOT_PATH):
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_path = snapshot_path
+        # key -> (value, fetched monotonic time, fetched wall-clock time, source, loader args, roster version)
+        self._entries = LRUCache(maxsize=max_entries)
+        self._refreshing = set()
+        self._tasks = set()
+        self._snapshot_lock = threading.Lock()
+        self._listeners = []
+        self._version = None
+        self._version_checked_at = None
+        self.last_changes = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.unchanged_refreshes = 0
+        self.changed_refreshes = 0
+
+    def add_listener(self, listener):
+        """Call listener(key, old_teams, new_teams, diff) whenever a cached roster changes"""
+        self._listeners.append(listener)
+
+    async def current_version(self):
+        """Roster version from the storage backend, reused for ROSTER_CHANGE_CHECK_SECONDS (None if unavailable)"""
+        now = time.monotonic()
+        if self._version_checked_at is not None and now - self._version_checked_at < ROSTER_CHANGE_CHECK_SECONDS:
+            return self._version
+        try:
+            version = await sheet_reads.do("roster_version", storage.roster_version)
+        except Exception as e:
+            log_event(logging.WARNING, "roster.version_failed", "Roster change check failed, reloading in full", error=str(e))
+            return None
+        self._version, self._version_checked_at = version, time.monotonic()
+        return version
+
+    async def get(self, key, loader, *args):
+        """Return the cached value for key, loading it with loader(*args) on a miss"""
+        entry = self._entries.get(key)
         
-        if not all_values:
-            return {"error": "No data found in the sheet"}
+        if entry is None:
+            self.misses += 1
+            metrics.inc("cache_lookups_total", cache="roster", result="miss")
+            return await self._load(key, loader, *args)
         
-        # Find columns for all required fields
-        header_row = all_values[0]
-        team_name_col = None
-        team_leader_col = None
-        team_member1_col = None
-        team_member2_col = None
-        reg_leader_col = None
-        reg_member1_col = None
-        reg_member2_col = None
+        value, fetched_at = entry[0], entry[1]
+        if time.monotonic() - fetched_at <= self.ttl_seconds:
+            self.hits += 1
+            metrics.inc("cache_lookups_total", cache="roster", result="hit")
+            return value
         
-        print(f"Headers: {header_row}")
+        # Serve the stale copy and refresh it once in the background
+        self.stale_hits += 1
+        metrics.inc("cache_lookups_total", cache="roster", result="stale")
+        self._schedule_refresh(key, loader, *args)
+        return value
+
+    def _schedule_refresh(self, key, loader, *args):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, loader, *args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load(self, key, loader, *args, version=None):
+        # Read the version before the rows: a change in between only causes one extra reload later
+        if version is None:
+            version = await self.current_version()
+        # Concurrent misses and refreshes for the same key share one fetch
+        value = await sheet_reads.do(key, loader, *args)
+        if not is_cacheable_roster(value):
+            return value
         
-        # Look for all columns with detailed matching
-        for i, header in enumerate(header_row):
-            header_lower = header.lower().strip()
-            print(f"Column {i}: '{header}' -> '{header_lower}'")
-            
-            # Team Name
-            if ('team' in header_lower and 'name' in header_lower) or header_lower == 'team name':
-                team_name_col = i
-                print(f"Found team name column at index {i}: '{header}'")
-            
-            # Team Leader
-            elif ('team' in header_lower and 'leader' in header_lower) or 'leader' in header_lower:
-                if 'reg' not in header_lower and 'number' not in header_lower:
-                    team_leader_col = i
-                    print(f"Found team leader column at index {i}: '{header}'")
-            
-            # Team Member 1
-            elif ('team' in header_lower and 'member' in header_lower and '1' in header_lower) or \
-                 ('member' in header_lower and '1' in header_lower):
-                if 'reg' not in header_lower and 'number' not in header_lower:
-                    team_member1_col = i
-                    print(f"Found team member 1 column at index {i}: '{header}'")
-            
-            # Team Member 2
-            elif ('team' in header_lower and 'member' in header_lower and '2' in header_lower) or \
-                 ('member' in header_lower and '2' in header_lower):
-                if 'reg' not in header_lower and 'number' not in header_lower:
-                    team_member2_col = i
-                    print(f"Found team member 2 column at index {i}: '{header}'")
-            
-            # Registration Numbers - Updated mapping
-            elif 'reg' in header_lower and ('number' in header_lower or 'no' in header_lower):
-                if 'leader' in header_lower or ('1' in header_lower and 'member' not in header_lower):
-                    reg_leader_col = i
-                    print(f"Found registration number for leader (Reg Number1) column at index {i}: '{header}'")
-                elif '2' in header_lower:
-                    reg_member1_col = i  # Reg Number2 goes to reg_member1
-                    print(f"Found registration number for member 1 (Reg Number2) column at index {i}: '{header}'")
-                elif '3' in header_lower:
-                    reg_member2_col = i  # Reg Number3 goes to reg_member2
-                    print(f"Found registration number for member 2 (Reg Number3) column at index {i}: '{header}'")
-        
-        # Broader search if exact matches not found
-        if team_name_col is None:
-            for i, header in enumerate(header_row):
-                if 'team' in header.lower():
-                    team_name_col = i
-                    print(f"Using broader match for team column at index {i}: '{header}'")
-                    break
+        previous = self._entries.get(key)
+        changed = previous is None or previous[0] != value
+        if not changed:
+            # Keep the cached object: its identity tells listeners (e.g. the lookup index) nothing changed
+            value = previous[0]
+        elif previous is not None:
+            old_teams = roster_teams(previous[0])
+            merged, diff = diff_rosters(old_teams, roster_teams(value))
+            value = with_roster_teams(value, merged)
+            self.last_changes[key] = {
+                "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "added": len(diff["added"]),
+                "removed": len(diff["removed"]),
+                "changed": len(diff["changed"])
+            }
+            log_event(logging.INFO, "roster.changed", "Roster changed", key=key, **self.last_changes[key])
         
-        if team_leader_col is None:
-            for i, header in enumerate(header_row):
-                if 'leader' in header.lower() and 'reg' not in header.lower():
-                    team_leader_col = i
-                    print(f"Using broader match for team leader column at index {i}: '{header}'")
-                    break
+        self._entries[key] = (value, time.monotonic(), time.time(), "sheets", args, version)
+        if previous is not None and changed:
+            for listener in self._listeners:
+                try:
+                    listener(key, old_teams, roster_teams(value), diff)
+                except Exception as e:
+                    log_event(logging.WARNING, "roster.listener_failed", "Roster change listener failed", key=key, error=str(e))
+        # Also persist a new version for unchanged rows, so a restart can skip the download
+        if self.snapshot_path and (changed or previous[5] != version):
+            # Collect the entries here; only the file write leaves the event loop
+            await asyncio.to_thread(self.write_snapshot, self.snapshot_payload())
+        return value
+
+    async def _refresh(self, key, loader, *args):
+        try:
+            version = await self.current_version()
+            entry = self._entries.get(key)
+            if version is not None and entry is not None and entry[5] == version:
+                # Spreadsheet untouched since this copy was loaded: keep it and skip the download
+                self._entries[key] = (entry[0], time.monotonic(), time.time(), "sheets", entry[4], version)
+                self.unchanged_refreshes += 1
+                metrics.inc("roster_sync_total", result="unchanged")
+                return
+            await self._load(key, loader, *args, version=version)
+            self.changed_refreshes += 1
+            metrics.inc("roster_sync_total", result="reloaded")
+        except Exception as e:
+            # Keep serving the stale copy
+            log_event(logging.WARNING, "roster.refresh_failed", "Background roster refresh failed", key=key, error=str(e))
+        finally:
+            self._refreshing.discard(key)
+
+    def _peek_items(self):
+        """(key, entry) pairs without touching the LRU order"""
+        return [(key, Cache.__getitem__(self._entries, key)) for key in list(self._entries)]
+
+    def snapshot_payload(self):
+        """Every cached roster, ready for write_snapshot; build it on the event loop"""
+        entries = [
+            {"key": list(key), "args": list(entry[4]), "fetched_at": entry[2], "version": entry[5], "value": entry[0]}
+            for key, entry in self._peek_items()
+        ]
+        return {"version": ROSTER_SNAPSHOT_VERSION, "entries": entries}
+
+    def save_snapshot(self):
+        """Atomically write every cached roster to the snapshot file"""
+        self.write_snapshot(self.snapshot_payload())
+
+    def write_snapshot(self, payload: dict):
+        """Atomically write a snapshot_payload() to the snapshot file (safe to run in a thread)"""
+        with self._snapshot_lock:
+            temp_path = f"{self.snapshot_path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(temp_path, self.snapshot_path)
+
+    def restore_snapshot(self):
+        """
+        Load rosters from the snapshot file. They are marked stale so the
+        first read serves them and triggers a refresh. Returns the count loaded.
+        """
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        with open(self.snapshot_path, "r") as f:
+            payload = json.load(f)
+        if payload.get("version") != ROSTER_SNAPSHOT_VERSION:
+            return 0
         
-        # Look for member columns if not found
-        if team_member1_col is None:
-            for i, header in enumerate(header_row):
-                header_lower = header.lower()
-                if 'member' in header_lower and ('1' in header_lower or 'one' in header_lower) and 'reg' not in header_lower:
-                    team_member1_col = i
-                    print(f"Using broader match for team member 1 column at index {i}: '{header}'")
-                    break
+        stale_at = time.monotonic() - self.ttl_seconds - 1
+        for item in payload.get("entries", []):
+            key = tuple(item["key"])
+            if key not in self._entries:
+                self._entries[key] = (item["value"], stale_at, item["fetched_at"], "snapshot", tuple(item["args"]),
+                                      item.get("version"))
+        return len(payload.get("entries", []))
+
+    def refresh_all(self, loader):
+        """Start a background refresh of every cached roster"""
+        for key, entry in self._peek_items():
+            self._schedule_refresh(key, loader, *entry[4])
+
+    def freshness(self):
+        """Age and origin of every cached roster"""
+        now = time.monotonic()
+        return [
+            {
+                "sheet_id": key[0],
+                "gid": key[1],
+                "source": entry[3],
+                "fetched_at": datetime.fromtimestamp(entry[2]).strftime("%Y-%m-%d %H:%M:%S"),
+                "age_seconds": round(time.time() - entry[2], 1),
+                "stale": now - entry[1] > self.ttl_seconds,
+                "refreshing": key in self._refreshing,
+                "version": entry[5],
+                "last_change": self.last_changes.get(key)
+            }
+            for key, entry in self._peek_items()
+        ]
+
+    def invalidate(self, key=None):
+        """Drop one cached entry, or all of them; returns how many were removed"""
+        if key is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        return 1 if self._entries.pop(key, None) is not None else 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced_reads": sheet_reads.coalesced,
+            "unchanged_refreshes": self.unchanged_refreshes,
+            "changed_refreshes": self.changed_refreshes
+        }
+
+# Shared roster cache used by the /teams endpoints
+roster_cache = RosterCache()
+
+def roster_cache_key(category: str = None):
+    """
+    Cache key for a roster read: the main teams sheet when category is None,
+    otherwise the batch sheet(s) behind the category (None if the category is invalid)
+    """
+    if category is None:
+        return (REGISTRATION_SHEET_ID, TEAMS_GID)
+    category_key = normalize_roster_category(category)
+    if category_key == "ai/ml":
+        return (REGISTRATION_SHEET_ID, AIML_BATCH_GID)
+    if category_key == "cyber":
+        return (REGISTRATION_SHEET_ID, CYBER_BATCH_GID)
+    if category_key == "full stack":
+        return (REGISTRATION_SHEET_ID, f"{AIML_BATCH_GID}+{CYBER_BATCH_GID}")
+    return None
+
+# Fields of each /teams entry (category rosters use ROSTER_FIELDS)
+TEAMS_FIELDS = ["team_name", "domains", "team_leader"]
+
+# Largest page a roster query may ask for
+ROSTER_PAGE_MAX_LIMIT = 500
+
+def encode_roster_cursor(position: int):
+    """Opaque cursor pointing just past a position in the cached roster"""
+    return base64.urlsafe_b64encode(f"roster:{position}".encode()).decode().rstrip("=")
+
+def decode_roster_cursor(cursor: str):
+    """Position encoded by encode_roster_cursor, or None if the cursor is malformed"""
+    try:
+        prefix, _, position = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().partition(":")
+        return int(position) if prefix == "roster" and int(position) >= 0 else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def query_roster(teams: list, allowed_fields: list, limit: int = None, cursor: str = None, fields: str = None,
+                 leader_reg: str = None, name_prefix: str = None):
+    """
+    Filter, page and project a cached roster without copying it.
+    Scanning stops once the page is full, so the work and the response
+    size follow the page rather than the sheet.
+    Returns {"teams": [...], "next_cursor": ...} or an error dict.
+    """
+    if limit is not None and not 1 <= limit <= ROSTER_PAGE_MAX_LIMIT:
+        return {"error": f"Invalid limit: {limit}. Use a value between 1 and {ROSTER_PAGE_MAX_LIMIT}"}
+    
+    start = 0
+    if cursor:
+        start = decode_roster_cursor(cursor)
+        if start is None:
+            return {"error": "Invalid cursor"}
+    
+    projection = None
+    if fields:
+        projection = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in projection if field not in allowed_fields]
+        if unknown:
+            return {"error": f"Unknown field(s): {', '.join(unknown)}. Available fields: {', '.join(allowed_fields)}"}
+    
+    prefix = name_prefix.strip().lower() if name_prefix else None
+    reg = leader_reg.strip().upper() if leader_reg else None
+    
+    page = []
+    next_cursor = None
+    for position in range(start, len(teams)):
+        team = teams[position]
+        if prefix and not team.get("team_name", "").lower().startswith(prefix):
+            continue
+        if reg:
+            # Category rosters have the leader's reg number; /teams only has "Name - Reg" text
+            if "reg_leader" in team:
+                if team["reg_leader"].strip().upper() != reg:
+                    continue
+            elif reg not in team.get("team_leader", "").upper():
+                continue
+        if limit is not None and len(page) == limit:
+            next_cursor = encode_roster_cursor(page_end)
+            break
+        page.append({field: team.get(field) for field in projection} if projection else team)
+        page_end = position + 1
+    
+    return {"teams": page, "next_cursor": next_cursor}
+
+def is_roster_query(*params):
+    """True when any pagination, projection or filter parameter was given"""
+    return any(param is not None for param in params)
+
+# Roster sheets covered by the lookup index (Full Stack is the union of both)
+LOOKUP_CATEGORIES = ["AI/ML", "Cyber"]
+
+# (name field, reg number field, role) for each person on a roster team
+ROSTER_PEOPLE = [
+    ("team_leader", "reg_leader", "leader"),
+    ("team_member1", "reg_member1", "member1"),
+    ("team_member2", "reg_member2", "member2")
+]
+
+# Largest result list /search returns
+SEARCH_MAX_LIMIT = 50
+
+class RosterLookupIndex:
+    """
+    Check-in lookups over the cached category rosters:
+    an exact map from reg number to (team, category, role) and a sorted
+    prefix index over team and member names, searched with bisect.
+    Names are indexed from every word start, so "kum" finds "Joel Kumar".
+    Small roster changes are applied in place from the roster cache's
+    row diff; anything else rebuilds the index from the cached lists.
+    """
+
+    # Above this share of changed rows a full rebuild is cheaper than in-place edits
+    MAX_INCREMENTAL_SHARE = 0.2
+
+    def __init__(self):
+        self._sources = {}
+        self._by_regno = {}
+        self._name_keys = []
+        self._name_postings = []
+        self.builds = 0
+        self.incremental_updates = 0
+        self.built_at = None
+
+    @staticmethod
+    def normalize(text: str):
+        return " ".join(str(text).lower().split())
+
+    def is_current(self, rosters: list):
+        return len(self._sources) == len(rosters) and all(
+            self._sources.get(category) is teams for category, teams in rosters)
+
+    def _team_entries(self, category: str, team: dict):
+        """(reg number postings, name postings) for one roster team"""
+        regnos = []
+        team_name = team.get("team_name", "")
+        names = [(team_name, {"category": category, "field": "team_name", "name": team_name, "team": team})]
+        for name_field, reg_field, role in ROSTER_PEOPLE:
+            regno = team.get(reg_field, "").strip().upper()
+            if regno and regno != "NOT SPECIFIED":
+                regnos.append((regno, {"category": category, "role": role, "team": team}))
+            person = team.get(name_field, "")
+            if person and person != "Not specified":
+                names.append((person, {"category": category, "field": name_field, "name": person, "team": team}))
         
-        if team_member2_col is None:
-            for i, header in enumerate(header_row):
-                header_lower = header.lower()
-                if 'member' in header_lower and ('2' in header_lower or 'two' in header_lower) and 'reg' not in header_lower:
-                    team_member2_col = i
-                    print(f"Using broader match for team member 2 column at index {i}: '{header}'")
-                    break
+        # One key per word start: "joel kumar" -> "joel kumar", "kumar"
+        name_entries = []
+        for name, posting in names:
+            words = self.normalize(name).split(" ")
+            for word in range(len(words)):
+                name_entries.append((" ".join(words[word:]), posting))
+        return regnos, name_entries
+
+    def build(self, rosters: list):
+        """Index (category, teams) pairs; rosters holds the cached team lists"""
+        by_regno = {}
+        entries = []
+        for category, teams in rosters:
+            for team in teams:
+                regnos, name_entries = self._team_entries(category, team)
+                for regno, posting in regnos:
+                    by_regno.setdefault(regno, []).append(posting)
+                entries.extend(name_entries)
+        entries.sort(key=lambda entry: entry[0])
         
-        # Look for registration number columns if not found - Updated logic
-        if reg_leader_col is None:
-            for i, header in enumerate(header_row):
-                header_lower = header.lower()
-                if ('reg' in header_lower or 'registration' in header_lower) and \
-                   (('1' in header_lower and 'member' not in header_lower) or 'leader' in header_lower):
-                    reg_leader_col = i
-                    print(f"Using broader match for reg leader (Reg Number1) column at index {i}: '{header}'")
+        self._by_regno = by_regno
+        self._name_keys = [entry[0] for entry in entries]
+        self._name_postings = [entry[1] for entry in entries]
+        self._sources = {category: teams for category, teams in rosters}
+        self.builds += 1
+        self.built_at = time.time()
+        log_event(logging.INFO, "lookup.built", "Built roster lookup index",
+                  regnos=len(by_regno), name_keys=len(entries))
+
+    def _remove_team(self, category: str, team: dict):
+        regnos, name_entries = self._team_entries(category, team)
+        for regno, _ in regnos:
+            remaining = [posting for posting in self._by_regno.get(regno, []) if posting["team"] is not team]
+            if remaining:
+                self._by_regno[regno] = remaining
+            else:
+                self._by_regno.pop(regno, None)
+        for key, posting in name_entries:
+            position = bisect.bisect_left(self._name_keys, key)
+            while position < len(self._name_keys) and self._name_keys[position] == key:
+                candidate = self._name_postings[position]
+                if candidate["team"] is team and candidate["field"] == posting["field"]:
+                    del self._name_keys[position]
+                    del self._name_postings[position]
                     break
+                position += 1
+
+    def _add_team(self, category: str, team: dict):
+        regnos, name_entries = self._team_entries(category, team)
+        for regno, posting in regnos:
+            self._by_regno.setdefault(regno, []).append(posting)
+        for key, posting in name_entries:
+            position = bisect.bisect_right(self._name_keys, key)
+            self._name_keys.insert(position, key)
+            self._name_postings.insert(position, posting)
+
+    def on_roster_change(self, key, old_teams: list, new_teams: list, diff: dict):
+        """Roster cache listener: apply a category roster's row diff in place"""
+        category = next((name for name in LOOKUP_CATEGORIES if roster_cache_key(name) == key), None)
+        if category is None or self._sources.get(category) is not old_teams:
+            # Not indexed from this copy; the next lookup rebuilds if needed
+            return
         
-        if reg_member1_col is None:
-            for i, header in enumerate(header_row):
-                header_lower = header.lower()
-                if ('reg' in header_lower or 'registration' in header_lower) and '2' in header_lower:
-                    reg_member1_col = i
-                    print(f"Using broader match for reg member 1 (Reg Number2) column at index {i}: '{header}'")
-                    break
+        edits = len(diff["added"]) + len(diff["removed"]) + len(diff["changed"])
+        if edits > max(1, len(new_teams)) * self.MAX_INCREMENTAL_SHARE:
+            return
         
-        if reg_member2_col is None:
-            for i, header in enumerate(header_row):
-                header_lower = header.lower()
-                if ('reg' in header_lower or 'registration' in header_lower) and '3' in header_lower:
-                    reg_member2_col = i
-                    print(f"Using broader match for reg member 2 (Reg Number3) column at index {i}: '{header}'")
+        for team in diff["removed"]:
+            self._remove_team(category, team)
+        for old_team, new_team in diff["changed"]:
+            self._remove_team(category, old_team)
+            self._add_team(category, new_team)
+        for team in diff["added"]:
+            self._add_team(category, team)
+        self._sources[category] = new_teams
+        self.incremental_updates += 1
+        log_event(logging.INFO, "lookup.updated", "Applied roster diff to lookup index", category=category,
+                  added=len(diff["added"]), removed=len(diff["removed"]), changed=len(diff["changed"]))
+
+    def lookup(self, regno: str):
+        """Every team the reg number appears on, with category and role"""
+        return self._by_regno.get(regno.strip().upper(), [])
+
+    def search(self, query: str, limit: int = 20):
+        """Names starting with query (at any word), at most limit, one hit per person or team"""
+        prefix = self.normalize(query)
+        if not prefix:
+            return []
+        matches = []
+        seen = set()
+        position = bisect.bisect_left(self._name_keys, prefix)
+        while position < len(self._name_keys) and self._name_keys[position].startswith(prefix):
+            posting = self._name_postings[position]
+            identity = (id(posting["team"]), posting["field"])
+            if identity not in seen:
+                seen.add(identity)
+                matches.append(posting)
+                if len(matches) == limit:
                     break
-        
-        if team_name_col is None:
-            return {"error": "Could not find team name column"}
-        
-        # Extract team data with all available information
-        teams_data = []
-        max_col = max(filter(None, [team_name_col, team_leader_col, team_member1_col, team_member2_col, 
-                                   reg_leader_col, reg_member1_col, reg_member2_col]))
-        
-        for row_idx, row in enumerate(all_values[1:], 1):  # Skip header row
-            if len(row) > max_col:
-                team_name = row[team_name_col].strip() if team_name_col < len(row) else ""
-                
-                if team_name:  # Only include rows with team name
-                    team_entry = {
-                        'team_name': team_name,
-                        'team_leader': row[team_leader_col].strip() if team_leader_col is not None and team_leader_col < len(row) else "Not specified",
-                        'team_member1': row[team_member1_col].strip() if team_member1_col is not None and team_member1_col < len(row) else "Not specified",
-                        'team_member2': row[team_member2_col].strip() if team_member2_col is not None and team_member2_col < len(row) else "Not specified",
-                        'reg_leader': row[reg_leader_col].strip() if reg_leader_col is not None and reg_leader_col < len(row) else "Not specified",
-                        'reg_member1': row[reg_member1_col].strip() if reg_member1_col is not None and reg_member1_col < len(row) else "Not specified",
-                        'reg_member2': row[reg_member2_col].strip() if reg_member2_col is not None and reg_member2_col < len(row) else "Not specified"
-                    }
-                    teams_data.append(team_entry)
-                    print(f"Row {row_idx}: {team_name} -> Leader: {team_entry['team_leader']} ({team_entry['reg_leader']}) | Member1: {team_entry['team_member1']} ({team_entry['reg_member1']}) | Member2: {team_entry['team_member2']} ({team_entry['reg_member2']})")
-        
+            position += 1
+        return matches
+
+    def stats(self):
         return {
-            "success": True,
-            "category": category,
-            "count": len(teams_data),
-            "teams": teams_data
+            "builds": self.builds,
+            "incremental_updates": self.incremental_updates,
+            "built_at": datetime.fromtimestamp(self.built_at).strftime("%Y-%m-%d %H:%M:%S") if self.built_at else None,
+            "regnos": len(self._by_regno),
+            "name_keys": len(self._name_keys)
         }
-        
+
+# Shared lookup index for /lookup and /search
+roster_lookup = RosterLookupIndex()
+roster_cache.add_listener(roster_lookup.on_roster_change)
+
+async def get_roster_lookup():
+    """Lookup index over the current cached rosters, rebuilt if any roster changed"""
+    results = await asyncio.gather(*(
+        roster_cache.get(roster_cache_key(category), load_roster, category) for category in LOOKUP_CATEGORIES
+    ))
+    for category, result in zip(LOOKUP_CATEGORIES, results):
+        if not isinstance(result, dict) or "error" in result:
+            error = result.get("error") if isinstance(result, dict) else "Failed to fetch data from Google Sheets"
+            raise HTTPException(status_code=503, detail={"error": f"{category} roster unavailable", "message": error})
+    
+    rosters = [(category, result["teams"]) for category, result in zip(LOOKUP_CATEGORIES, results)]
+    if not roster_lookup.is_current(rosters):
+        roster_lookup.build(rosters)
+    return roster_lookup
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks for the API"""
+    # Serve the last good rosters straight away, refreshing them in the background
+    try:
+        restored = roster_cache.restore_snapshot()
+        if restored:
+            log_event(logging.INFO, "roster.snapshot_restored", "Restored rosters from snapshot",
+                      rosters=restored, path=roster_cache.snapshot_path)
+            roster_cache.refresh_all(load_roster)
     except Exception as e:
-        print(f"Error fetching teams by category: {str(e)}")
-        traceback.print_exc()
-        return {"error": f"Internal server error: {str(e)}"}
+        log_event(logging.WARNING, "roster.snapshot_failed", "Could not restore roster snapshot", error=str(e))
+    
+    # Authorize once and open the known spreadsheets before serving requests
+    try:
+        await run_sheets_call(storage.warm_up)
+        log_event(logging.INFO, "storage.ready", "Storage backend ready", backend=storage.name)
+    except Exception as e:
+        # Requests will retry the authorization lazily
+        log_event(logging.WARNING, "storage.warm_up_failed", "Could not warm up storage backend", backend=storage.name, error=str(e))
+    
+    # Create any missing attendance worksheets so check-ins never pay for it
+    report = await run_sheets_write(storage.ensure_attendance_worksheets)
+    if report["error"]:
+        log_event(logging.ERROR, "attendance.provisioning_failed", "Attendance worksheet provisioning failed", error=report["error"])
+    
+    # Replays anything left in the journal by a previous run, then keeps draining it
+    flusher = asyncio.create_task(attendance_flusher())
+    yield
+    flusher.cancel()
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording request count and latency per route template
+    (e.g. /teams-by-category/{category}), including time spent streaming the body
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.monotonic()
+        status = {"code": 500}
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Unmatched paths share one label so scanners of random URLs can't blow up the series count
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            metrics.observe("http_request_duration_seconds", time.monotonic() - started,
+                            method=scope["method"], route=route_path)
+            metrics.inc("http_requests_total", method=scope["method"], route=route_path, status=status["code"])
 
 # Create FastAPI app
 app = FastAPI(
     title="Team Domains API",
     description="API to fetch team names and domains from Google Sheets",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -893,11 +3522,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost middleware, so request latency includes everything below it
+app.add_middleware(RequestMetricsMiddleware)
+
 @app.get("/teams")
-async def get_teams():
-    """API endpoint to fetch team names and domains"""
+async def get_teams(limit: int = None, cursor: str = None, fields: str = None,
+                    leader_reg: str = None, name_prefix: str = None):
+    """
+    API endpoint to fetch team names and domains
+    Optional: limit/cursor paging, fields=team_name,domains projection,
+    name_prefix= and leader_reg= filters, all served from the cached roster
+    """
     try:
-        data = scan_google_sheets()
+        data = await roster_cache.get(roster_cache_key(), load_roster)
         
         if data is None:
             raise HTTPException(
@@ -908,12 +3545,26 @@ async def get_teams():
                 }
             )
         
+        if not is_roster_query(limit, cursor, fields, leader_reg, name_prefix):
+            return {
+                "success": True,
+                "count": len(data),
+                "teams": data
+            }
+        
+        page = query_roster(data, TEAMS_FIELDS, limit, cursor, fields, leader_reg, name_prefix)
+        if "error" in page:
+            raise HTTPException(status_code=400, detail=page)
+        
         return {
             "success": True,
-            "count": len(data),
-            "teams": data
+            "count": len(page["teams"]),
+            "teams": page["teams"],
+            "next_cursor": page["next_cursor"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -923,52 +3574,432 @@ async def get_teams():
             }
         )
 
-@app.post("/attendance")
-async def save_attendance(request: MassAttendanceRequest):
+@app.get("/teams/freshness")
+async def get_roster_freshness():
     """
-    API endpoint to save mass attendance data to Google Sheets
-    Accepts an array of attendance records
+    API endpoint showing how old each cached roster is and whether it came from Google Sheets or the on-disk snapshot
+    """
+    return {
+        "success": True,
+        "ttl_seconds": roster_cache.ttl_seconds,
+        "rosters": roster_cache.freshness()
+    }
+
+# Idempotency-Key replay store for POST /attendance
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+
+class IdempotencyStore:
+    """
+    Remembers the response sent for each Idempotency-Key for a while, so a
+    retried request gets the original answer back without touching Google
+    Sheets. A request arriving while the first one with its key is still
+    running waits for it. Only final responses are kept (2xx by default, see
+    run); anything else runs again on retry.
+    """
+
+    def __init__(self, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        # key -> (request fingerprint, status code, response body)
+        self._results = TTLCache(maxsize=max_keys, ttl=ttl_seconds)
+        # key -> (request fingerprint, future set when the first request finishes)
+        self._in_flight = {}
+        self.replayed = 0
+        self.waited = 0
+        self.conflicts = 0
+
+    def _conflict(self, key: str):
+        self.conflicts += 1
+        raise HTTPException(status_code=422, detail={
+            "error": "Idempotency key reused",
+            "message": f"Idempotency-Key {key} was already used with a different request body"
+        })
+
+    async def run(self, key: str, fingerprint: str, handler, is_final=None):
+        """
+        Response for this key: replayed, awaited from the in-flight request, or
+        from handler() -> (status, body). It is stored for replay when
+        is_final(status, body) is true (default: any 2xx status).
+        """
+        while True:
+            stored = self._results.get(key)
+            if stored is not None:
+                if stored[0] != fingerprint:
+                    self._conflict(key)
+                self.replayed += 1
+                metrics.inc("cache_lookups_total", cache="idempotency", result="hit")
+                return JSONResponse(status_code=stored[1], content=stored[2], headers={"Idempotency-Replayed": "true"})
+            
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            if pending[0] != fingerprint:
+                self._conflict(key)
+            # Wait for the first request; if it failed, the loop falls through and this one runs
+            self.waited += 1
+            await asyncio.shield(pending[1])
+        
+        metrics.inc("cache_lookups_total", cache="idempotency", result="miss")
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, done)
+        try:
+            status_code, content = await handler()
+            if is_final(status_code, content) if is_final else 200 <= status_code < 300:
+                self._results[key] = (fingerprint, status_code, content)
+            return JSONResponse(status_code=status_code, content=content)
+        finally:
+            del self._in_flight[key]
+            done.set_result(None)
+
+    def stats(self):
+        return {
+            "keys": len(self._results),
+            "in_flight": len(self._in_flight),
+            "ttl_seconds": self._results.ttl,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "conflicts": self.conflicts
+        }
+
+# Shared store for POST /attendance retries
+attendance_idempotency = IdempotencyStore()
+
+def is_final_attendance_response(status_code: int, content: dict):
     """
+    A POST /attendance response may be replayed only if every record settled.
+    Records that hit API, permission or internal errors must be written by the retry.
+    """
+    return 200 <= status_code < 300 and not content.get("summary", {}).get("retryable")
+
+async def process_attendance_request(request: MassAttendanceRequest, mode: str):
+    """Run one POST /attendance request; returns (status code, body) or raises HTTPException"""
     try:
         if not request.attendance_records:
             raise HTTPException(status_code=400, detail={"error": "No attendance records provided"})
         
-        result = save_mass_attendance_to_sheets(request.attendance_records)
+        if mode == "queued":
+            result = await asyncio.to_thread(queue_mass_attendance, request.attendance_records)
+            if "error" in result:
+                raise HTTPException(status_code=500, detail=result)
+            return 202, result
+        elif mode != "sync":
+            raise HTTPException(status_code=400, detail={"error": f"Invalid mode: {mode}. Use 'sync' or 'queued'"})
+        
+        result = await run_sheets_write(save_mass_attendance_to_sheets, request.attendance_records)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result)
         
-        return result
+        return 200, result
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail={"error": "Internal server error", "message": str(e)})
 
+@app.post("/attendance")
+async def save_attendance(request: MassAttendanceRequest, mode: str = "sync", idempotency_key: str = Header(None)):
+    """
+    API endpoint to save mass attendance data to Google Sheets
+    Accepts an array of attendance records
+    With ?mode=queued, records are validated, journaled locally and written
+    to Google Sheets in the background (responds 202)
+    With an Idempotency-Key header, a retry with the same key gets the
+    original response back without any Google Sheets calls
+    """
+    if not idempotency_key:
+        status_code, content = await process_attendance_request(request, mode)
+        return JSONResponse(status_code=status_code, content=content)
+    
+    if len(idempotency_key) > 255:
+        raise HTTPException(status_code=400, detail={"error": "Idempotency-Key must be at most 255 characters"})
+    fingerprint = hashlib.sha256(
+        json.dumps([mode, request.model_dump()], sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+    return await attendance_idempotency.run(idempotency_key, fingerprint,
+                                            lambda: process_attendance_request(request, mode),
+                                            is_final_attendance_response)
+
+class ImportProgressResponse(StreamingResponse):
+    """
+    StreamingResponse whose generator reads the request body while it streams.
+    Below ASGI spec 2.4 (uvicorn included) the stock class also listens for a
+    client disconnect, which would swallow the upload chunks being read; a
+    disconnect still surfaces as ClientDisconnect from request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+@app.post("/attendance/import")
+async def import_attendance(request: Request, format: str = None):
+    """
+    API endpoint to bulk-import attendance from a CSV or NDJSON upload
+    The body is parsed as it arrives, and every ATTENDANCE_IMPORT_CHUNK_ROWS
+    rows are validated and written with one append per worksheet
+    Responds with NDJSON progress lines, then a summary line
+    """
+    content_type = request.headers.get("content-type", "").lower()
+    import_format = (format or "").lower()
+    if not import_format:
+        if "csv" in content_type:
+            import_format = "csv"
+        elif "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+            import_format = "ndjson"
+    if import_format not in ["csv", "ndjson"]:
+        raise HTTPException(status_code=400, detail={
+            "error": "Unknown import format",
+            "message": "Send Content-Type text/csv or application/x-ndjson, or pass ?format=csv|ndjson"
+        })
+    
+    async def body_chunks():
+        try:
+            async for chunk in request.stream():
+                yield chunk
+        except ClientDisconnect:
+            log_event(logging.WARNING, "attendance.import_disconnected", "Client disconnected during attendance import")
+            raise ValueError("Upload interrupted by the client")
+    
+    return ImportProgressResponse(import_attendance_stream(body_chunks(), import_format), media_type="application/x-ndjson")
+
+@app.get("/attendance/queue")
+async def get_attendance_queue_status():
+    """
+    API endpoint showing pending/flushed/rejected/failed counts of queued attendance
+    Failed entries kept erroring for ATTENDANCE_FLUSH_MAX_ATTEMPTS tries and are no longer retried
+    """
+    try:
+        counts = await asyncio.to_thread(attendance_journal_counts)
+        journal = get_attendance_journal()  # opened by the counts query above
+        return {
+            "success": True,
+            "counts": counts,
+            "max_attempts": ATTENDANCE_FLUSH_MAX_ATTEMPTS,
+            "last_flush_at": journal.last_flush_at,
+            "last_error": journal.last_error
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail={"error": "Internal server error", "message": str(e)})
+
+@app.post("/attendance/index/resync", dependencies=[Depends(require_session)])
+async def resync_attendance_index_endpoint():
+    """
+    API endpoint to re-read the attendance duplicate index from Google Sheets
+    Requires a session token from /login
+    """
+    try:
+        return {
+            "success": True,
+            "message": "Attendance duplicate index re-synced",
+            "worksheets": await run_sheets_write(resync_attendance_index)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail={"error": "Internal server error", "message": str(e)})
+
+@app.get("/attendance/stats")
+async def get_attendance_stats():
+    """
+    API endpoint with check-in counts per worksheet, day, category and hour.
+    Served from in-memory counters; only the first call after startup reads
+    the attendance worksheets not loaded yet
+    """
+    try:
+        if all(attendance_stats.is_seeded(name) for name in ATTENDANCE_WORKSHEETS):
+            stats = attendance_stats.snapshot()
+        else:
+            stats = await sheet_reads.do("attendance_stats_seed", seed_attendance_stats)
+        return {
+            "success": True,
+            "stats": stats
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail={"error": "Internal server error", "message": str(e)})
+
 @app.get("/teams-by-category/{category}")
-async def get_teams_by_category_endpoint(category: str):
+async def get_teams_by_category_endpoint(category: str, limit: int = None, cursor: str = None, fields: str = None,
+                                         leader_reg: str = None, name_prefix: str = None):
     """
     API endpoint to fetch team names and team leaders by category
     Categories: AI/ML, Cyber, Full Stack
+    Optional: limit/cursor paging, fields= projection, name_prefix= and leader_reg= filters
     """
     try:
-        result = get_teams_by_category(category)
+        key = roster_cache_key(category)
+        if key is None:
+            # Invalid category: nothing to cache, let the reader build the error
+            result = get_teams_by_category(category)
+        else:
+            result = await roster_cache.get(key, load_roster, category)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result)
         
-        return result
+        if not is_roster_query(limit, cursor, fields, leader_reg, name_prefix):
+            return result
+        
+        page = query_roster(result["teams"], ROSTER_FIELDS, limit, cursor, fields, leader_reg, name_prefix)
+        if "error" in page:
+            raise HTTPException(status_code=400, detail=page)
+        
+        # Same envelope as the full response, with only this page of teams
+        response = {name: value for name, value in result.items() if name not in ["count", "teams"]}
+        response.update({"count": len(page["teams"]), "teams": page["teams"], "next_cursor": page["next_cursor"]})
+        return response
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail={"error": "Internal server error", "message": str(e)})
 
+@app.get("/lookup")
+async def lookup_registration(regno: str):
+    """
+    API endpoint finding the team(s) and category of a registration number
+    (leader or member) from the cached rosters
+    """
+    if not regno.strip():
+        raise HTTPException(status_code=400, detail={"error": "regno is required"})
+    
+    index = await get_roster_lookup()
+    matches = index.lookup(regno)
+    if not matches:
+        raise HTTPException(status_code=404, detail={"error": f"Registration number {regno} not found in any roster"})
+    
+    return {
+        "success": True,
+        "regno": regno.strip().upper(),
+        "count": len(matches),
+        "matches": matches
+    }
+
+@app.get("/search")
+async def search_rosters(q: str, limit: int = 20):
+    """
+    API endpoint for name search: teams, leaders and members whose name
+    (or any word of it) starts with q
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail={"error": "q is required"})
+    if not 1 <= limit <= SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail={"error": f"Invalid limit: {limit}. Use a value between 1 and {SEARCH_MAX_LIMIT}"})
+    
+    index = await get_roster_lookup()
+    matches = index.search(q, limit)
+    return {
+        "success": True,
+        "query": q,
+        "count": len(matches),
+        "matches": matches
+    }
+
+@app.get("/diagnostics/worksheets")
+async def get_worksheet_diagnostics(refresh: bool = False, authorization: str = Header(None)):
+    """
+    API endpoint reporting attendance worksheet provisioning and header drift
+    Pass ?refresh=true to re-check the spreadsheet now (reads it and may repair
+    headers, so it requires a session token from /login)
+    """
+    if refresh:
+        await require_session(authorization)
+    report = await run_sheets_write(storage.ensure_attendance_worksheets) if refresh else provisioning_report
+    return {
+        "success": report.get("error") is None,
+        "expected_headers": ATTENDANCE_HEADERS,
+        "worksheets": ATTENDANCE_WORKSHEETS,
+        "report": report
+    }
+
+@app.get("/sheets/scheduler")
+async def get_sheets_scheduler_stats():
+    """
+    API endpoint showing Google Sheets API queue depth, quota tokens and retry counts
+    """
+    return {
+        "success": True,
+        "scheduler": sheets_scheduler.stats()
+    }
+
+def collect_metric_gauges(journal_counts: dict = None):
+    """Point-in-time values exported next to the counters on /metrics"""
+    gauges = {}
+    
+    # Hit ratio per cache from the lookup counters
+    lookups = {}
+    for labels, value in metrics.counter_values("cache_lookups_total").items():
+        labels = dict(labels)
+        totals = lookups.setdefault(labels["cache"], {"hit": 0, "total": 0})
+        totals["total"] += value
+        if labels["result"] in ["hit", "stale"]:
+            totals["hit"] += value
+    gauges["cache_hit_ratio"] = {
+        (("cache", cache),): round(totals["hit"] / totals["total"], 4)
+        for cache, totals in lookups.items() if totals["total"]
+    }
+    gauges["roster_cache_entries"] = {(): len(roster_cache._entries)}
+    
+    # How close the Google Sheets scheduler is to its quota
+    scheduler = sheets_scheduler.stats()
+    gauges["sheets_scheduler_queue_depth"] = {
+        (("kind", "read"),): scheduler["waiting_reads"],
+        (("kind", "write"),): scheduler["waiting_writes"]
+    }
+    gauges["sheets_scheduler_in_flight"] = {(): scheduler["in_flight"]}
+    gauges["sheets_scheduler_quota_tokens"] = {
+        (("kind", "read"),): scheduler["read_tokens"],
+        (("kind", "write"),): scheduler["write_tokens"]
+    }
+    
+    if journal_counts is not None:
+        gauges["attendance_journal_entries"] = {
+            (("status", status),): count for status, count in journal_counts.items()
+        }
+    
+    return gauges
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    API endpoint exposing request latency, Google Sheets API calls and cache
+    hit ratios in the Prometheus text format
+    """
+    try:
+        journal_counts = await asyncio.to_thread(attendance_journal_counts)
+    except Exception as e:
+        journal_counts = None
+        log_event(logging.WARNING, "metrics.journal_failed", "Could not read attendance journal counts", error=str(e))
+    return PlainTextResponse(metrics.render(collect_metric_gauges(journal_counts)), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/admin/cache/invalidate", dependencies=[Depends(require_session)])
+async def invalidate_roster_cache(category: str = None):
+    """
+    API endpoint to drop cached rosters so the next read goes to Google Sheets
+    Pass ?category=AI/ML (or teams) to drop one roster, or nothing to drop all
+    Requires a session token from /login
+    """
+    if category is None:
+        removed = roster_cache.invalidate()
+    else:
+        key = roster_cache_key(None if category.lower() == "teams" else category)
+        if key is None:
+            raise HTTPException(status_code=400, detail={"error": f"Invalid category: {category}. Use 'teams', 'AI/ML', 'Cyber', or 'Full Stack'"})
+        removed = roster_cache.invalidate(key)
+        # The combined Full Stack roster is built from the AI/ML and Cyber sheets
+        if normalize_roster_category(category) in ["ai/ml", "cyber"]:
+            removed += roster_cache.invalidate(roster_cache_key("full stack"))
+    
+    return {
+        "success": True,
+        "message": f"Invalidated {removed} cached roster(s)",
+        "cache": roster_cache.stats()
+    }
+
 @app.post("/login")
-async def login_user(request: LoginRequest):
+async def login_user(request: LoginRequest, http_request: Request):
     """
     API endpoint for user authentication
-    Accepts email and password for login
+    Accepts email and password for login and returns a signed session token
+    Repeated failures from one IP or for one email are answered with 429
     """
     try:
         if not request.email or not request.password:
@@ -981,12 +4012,39 @@ async def login_user(request: LoginRequest):
                 }
             )
         
-        result = authenticate_user(request.email, request.password)
+        client_ip = http_request.client.host if http_request.client else "unknown"
+        email = request.email.strip().lower()
+        retry_after = login_throttle.retry_after(client_ip, email)
+        if retry_after:
+            metrics.inc("login_attempts_total", result="throttled")
+            log_event(logging.WARNING, "login.throttled", "Login throttled", client_ip=client_ip, email=email)
+            raise HTTPException(
+                status_code=429,
+                detail={
+                    "success": False,
+                    "error": "Too many login attempts",
+                    "message": f"Try again in {retry_after} seconds"
+                },
+                headers={"Retry-After": str(retry_after)}
+            )
+        
+        # PBKDF2 takes a while on purpose: keep it off the event loop
+        result = await asyncio.to_thread(authenticate_user, email, request.password)
         
         if not result["success"]:
+            login_throttle.record_failure(client_ip, email)
+            metrics.inc("login_attempts_total", result="failed")
             raise HTTPException(status_code=401, detail=result)
         
-        return result
+        login_throttle.reset(email)
+        metrics.inc("login_attempts_total", result="success")
+        token, expires_at = session_tokens.issue(result["user"])
+        return {
+            **result,
+            "token": token,
+            "token_type": "bearer",
+            "expires_at": datetime.fromtimestamp(expires_at).strftime("%Y-%m-%d %H:%M:%S")
+        }
         
     except HTTPException:
         raise
@@ -1000,16 +4058,42 @@ async def login_user(request: LoginRequest):
             }
         )
 
+@app.get("/session")
+async def get_session(session: dict = Depends(require_session)):
+    """
+    API endpoint returning the user behind a session token
+    Send the token from /login as 'Authorization: Bearer <token>'
+    """
+    return {
+        "success": True,
+        "user": {"email": session["sub"], "name": session["name"], "role": session["role"]},
+        "expires_at": datetime.fromtimestamp(session["exp"]).strftime("%Y-%m-%d %H:%M:%S")
+    }
+
 @app.get("/")
 async def home():
     """Home endpoint with API information"""
     return {
         "message": "Team Domains API",
         "endpoints": {
-            "/teams": "GET - Fetch all team names and domains",
-            "/teams-by-category/{category}": "GET - Fetch team names and team leaders by category (AI/ML, Cyber, Full Stack)",
+            "/teams": "GET - Fetch all team names and domains (optional ?limit=&cursor=&fields=&name_prefix=&leader_reg=)",
+            "/teams-by-category/{category}": "GET - Fetch team names and team leaders by category (AI/ML, Cyber, Full Stack; same optional query parameters)",
+            "/lookup?regno=": "GET - Team, category and role for a registration number",
+            "/search?q=": "GET - Teams and people whose name starts with q (optional &limit=, max 50)",
+            "/teams/freshness": "GET - Age and source (Google Sheets or snapshot) of cached rosters",
             "/attendance": "POST - Save attendance data to Google Sheets",
-            "/login": "POST - User authentication with email and password",
+            "/attendance?mode=queued": "POST - Validate and queue attendance locally, written to Google Sheets in the background (202)",
+            "/attendance (Idempotency-Key header)": "POST - Retries with the same key get the original response back without Google Sheets calls",
+            "/attendance/import": "POST - Stream a CSV or NDJSON attendance file (regno, name, day, event_type, category, optional timestamp); responds with NDJSON progress",
+            "/attendance/queue": "GET - Pending, flushed, rejected and failed counts of queued attendance",
+            "/attendance/stats": "GET - Check-in counts per worksheet, day, category and hour (no Google Sheets reads after the first call)",
+            "/attendance/index/resync": "POST - Re-read the attendance duplicate index from Google Sheets (session token required)",
+            "/login": "POST - User authentication with email and password, returns a session token",
+            "/session": "GET - User behind the 'Authorization: Bearer <token>' session",
+            "/diagnostics/worksheets": "GET - Attendance worksheet provisioning and header drift (?refresh=true to re-check)",
+            "/sheets/scheduler": "GET - Google Sheets API queue depth, quota tokens and retry counts",
+            "/metrics": "GET - Prometheus metrics: request latency per route, Google Sheets API calls per operation, 429s, cache hit ratios",
+            "/admin/cache/invalidate": "POST - Drop cached rosters (optional ?category=teams|AI/ML|Cyber|Full Stack; session token required)",
             "/": "GET - API information",
             "/docs": "GET - Interactive API documentation",
             "/redoc": "GET - Alternative API documentation"
@@ -1026,6 +4110,10 @@ async def home():
                 "email": "User email address (string)",
                 "password": "User password (string)"
             },
+            "response": {
+                "token": "Signed session token, valid for SESSION_TTL_SECONDS",
+                "usage": "Send it as 'Authorization: Bearer <token>' to /session and the admin endpoints"
+            },
             "available_users": {
                 "admin": {
                     "email": "admin@innovatex.com",
@@ -1098,8 +4186,6 @@ async def home():
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
-    print("Starting Team Domains API with FastAPI...")
-    print("CORS enabled for frontend development")
-    print(f"Starting server on port {port}")
+    log_event(logging.INFO, "server.start", "Starting Team Domains API with FastAPI (CORS enabled)", port=port)
     
     uvicorn.run("sheets_scanner:app", host="0.0.0.0", port=port, reload=False)
\ No newline at end of file
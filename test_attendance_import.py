@@ -0,0 +1,94 @@
+import asyncio
+import os
+
+import pytest
+
+# Parsers only: keep the import away from Google Sheets
+os.environ.setdefault("STORAGE_BACKEND", "fake_sheets")
+os.environ.setdefault("FAKE_SHEETS_LATENCY_MS", "0")
+os.environ.setdefault("ROSTER_SNAPSHOT_PATH", "")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import sheets_scanner  # noqa: E402
+
+def parse(data: bytes, parser, chunk_size: int = 7):
+    """Feed data to iter_text_lines in small chunks and collect what parser yields"""
+    async def chunks():
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    async def collect():
+        return [row async for row in parser(sheets_scanner.iter_text_lines(chunks()))]
+
+    return asyncio.run(collect())
+
+def parse_csv(text: str, chunk_size: int = 7):
+    return parse(text.encode("utf-8"), sheets_scanner.iter_csv_rows, chunk_size)
+
+def parse_ndjson(text: str, chunk_size: int = 7):
+    return parse(text.encode("utf-8"), sheets_scanner.iter_ndjson_rows, chunk_size)
+
+def test_csv_header_aliases_and_line_numbers():
+    rows = parse_csv("Registration Number,Name,Day,Event Type,Category,Notes\r\n"
+                     "R1,Asha,1,bootcamp,AI/ML,ignored\r\n"
+                     "\r\n"
+                     "R2,Ravi,2,hackathon,,\r\n")
+    assert rows == [
+        (2, {"regno": "R1", "name": "Asha", "day": "1", "event_type": "bootcamp", "category": "AI/ML"}),
+        (4, {"regno": "R2", "name": "Ravi", "day": "2", "event_type": "hackathon", "category": ""}),
+    ]
+
+def test_csv_quoted_comma_and_multiline_field():
+    rows = parse_csv('regno,name,day,event_type\n'
+                     'R1,"Doe, John",1,hackathon\n'
+                     'R2,"Multi\nLine",1,hackathon\n'
+                     'R3,Last,2,hackathon')
+    assert [(number, row["name"]) for number, row in rows] == [(2, "Doe, John"), (3, "Multi\nLine"), (5, "Last")]
+
+def test_csv_literal_quote_in_unquoted_field():
+    rows = parse_csv('regno,name,day,event_type,category\n'
+                     'A1,Sam 6" Tall,1,hackathon,\n'
+                     'A2,Next,1,hackathon,\n')
+    assert [(number, row["regno"], row["name"]) for number, row in rows] == [(2, "A1", 'Sam 6" Tall'), (3, "A2", "Next")]
+
+def test_csv_malformed_row_is_reported_and_parsing_continues():
+    rows = parse_csv('regno,name,day,event_type\n'
+                     '"R1"x,Bad,1,hackathon\n'
+                     'R2,Good,1,hackathon\n')
+    assert rows[0][0] == 2 and "error" in rows[0][1]
+    assert rows[1] == (3, {"regno": "R2", "name": "Good", "day": "1", "event_type": "hackathon"})
+
+def test_csv_bom_and_multibyte_characters_split_across_chunks():
+    data = "﻿regno,name,day,event_type\nR1,Jöhn Ñame,1,hackathon\n".encode("utf-8")
+    for chunk_size in (1, 2, 3, 5):
+        rows = parse(data, sheets_scanner.iter_csv_rows, chunk_size)
+        assert rows == [(2, {"regno": "R1", "name": "Jöhn Ñame", "day": "1", "event_type": "hackathon"})]
+
+def test_csv_missing_header_columns():
+    with pytest.raises(ValueError, match="missing column"):
+        parse_csv("regno,name\nR1,Asha\n")
+
+def test_csv_unterminated_quote_at_end_of_file():
+    with pytest.raises(ValueError, match="Unterminated quoted field starting on line 2"):
+        parse_csv('regno,name,day,event_type\nR1,"Open,1,hackathon\nR2,x,1,hackathon\n')
+
+def test_ndjson_rows_and_errors():
+    rows = parse_ndjson('{"regno": "N1", "name": "a", "day": 1, "event_type": "bootcamp", "category": "Cyber"}\n'
+                        'not json\n'
+                        '[1, 2]\n'
+                        '\n'
+                        '{"regno": "N2", "name": "b", "day": "2", "event_type": "hackathon"}')
+    assert rows[0] == (1, {"regno": "N1", "name": "a", "day": 1, "event_type": "bootcamp", "category": "Cyber"})
+    assert rows[1][0] == 2 and rows[1][1]["error"].startswith("Invalid JSON")
+    assert rows[2] == (3, {"error": "Each line must be a JSON object"})
+    assert rows[3] == (5, {"regno": "N2", "name": "b", "day": "2", "event_type": "hackathon"})
+
+def test_resolve_import_row_normalizes_values():
+    target = sheets_scanner.resolve_import_row(
+        {"regno": " N1 ", "name": "a", "day": 1, "event_type": "bootcamp", "category": "ml", "timestamp": ""})
+    assert target == {
+        "worksheet_name": "AI/ML Bootcamp",
+        "entry": {"regno": "N1", "name": "a", "day": "1", "event_type": "bootcamp", "category": "ml", "timestamp": None}
+    }
+    assert "error" in sheets_scanner.resolve_import_row(
+        {"regno": "N1", "name": "a", "day": "1", "event_type": "hackathon", "timestamp": "yesterday"})
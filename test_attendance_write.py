@@ -0,0 +1,30 @@
+import os
+
+import requests
+
+# In-process Google Sheets stand-in without simulated latency
+os.environ.setdefault("STORAGE_BACKEND", "fake_sheets")
+os.environ.setdefault("FAKE_SHEETS_LATENCY_MS", "0")
+os.environ.setdefault("ROSTER_SNAPSHOT_PATH", "")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import sheets_scanner  # noqa: E402
+
+def test_append_timeout_after_write_is_caught_as_duplicate_on_retry(monkeypatch):
+    worksheet_name = "Hackathon Day 1"
+    entry = {"regno": "X1", "name": "Timeout", "day": "1", "event_type": "hackathon", "category": "AI/ML"}
+    append = sheets_scanner.storage.append_attendance_rows
+    
+    def append_then_time_out(name, rows):
+        append(name, rows)
+        raise requests.exceptions.ReadTimeout("read timed out")
+    
+    monkeypatch.setattr(sheets_scanner.storage, "append_attendance_rows", append_then_time_out)
+    first = sheets_scanner.write_attendance_group(worksheet_name, [entry])[0]
+    assert not sheets_scanner.is_settled_attendance_result(first)
+    
+    monkeypatch.setattr(sheets_scanner.storage, "append_attendance_rows", append)
+    retry = sheets_scanner.write_attendance_group(worksheet_name, [entry])[0]
+    assert retry["error"] == "Duplicate entry"
+    rows = sheets_scanner.storage.load_attendance_rows(worksheet_name)
+    assert sum(1 for row in rows if str(row[0]) == "X1") == 1
@@ -0,0 +1,22 @@
+import os
+
+os.environ.setdefault("STORAGE_BACKEND", "fake_sheets")
+os.environ.setdefault("FAKE_SHEETS_LATENCY_MS", "0")
+os.environ.setdefault("ROSTER_SNAPSHOT_PATH", "")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import sheets_scanner  # noqa: E402
+
+def test_issued_token_verifies():
+    tokens = sheets_scanner.SessionTokens(secret="test-secret")
+    token, _ = tokens.issue({"email": "a@example.com", "name": "A", "role": "admin"})
+    assert tokens.verify(token)["sub"] == "a@example.com"
+
+def test_tampered_and_non_ascii_tokens_are_rejected():
+    tokens = sheets_scanner.SessionTokens(secret="test-secret")
+    token, _ = tokens.issue({"email": "a@example.com", "name": "A", "role": "admin"})
+    payload, _, signature = token.partition(".")
+    assert tokens.verify(f"{payload}.{signature[:-1]}x") is None
+    assert tokens.verify("abc.déf") is None
+    assert tokens.verify(f"{payload}.{signature}é") is None
+    assert tokens.rejected == 3